@@ -0,0 +1,274 @@
+"""Stand-in for the hou module with a configurable synthetic scene.
+
+Only the parts of the API used by the Breakdown are implemented.
+Install it before importing any module of the tool:
+    sys.modules["hou"] = fake_hou
+"""
+
+import contextlib
+import re
+import types
+
+VARIABLES = {"$JOB": "/tmp/job", "$HIP": "/tmp/job/hip"}
+FRAME = 1
+CALLS = {}
+_NODES = {}
+_VARIABLE_REGEX = re.compile(r"\$(OS|F\d?|JOB|HIP)")
+_FRAME_REGEX = re.compile(r"\$F\d?(?![A-Za-z0-9_])|`")
+
+
+def _count(name: str):
+    CALLS[name] = CALLS.get(name, 0) + 1
+
+
+class Parm:
+    """hou.Parm with string value and optional reference to another parm."""
+
+    def __init__(self, node: "Node", name: str, value: str):
+        self._node = node
+        self._name = name
+        self._value = value
+        self._referenced = self
+
+    def __eq__(self, other) -> bool:
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def path(self) -> str:
+        _count("path")
+        return f"{self._node.path()}/{self._name}"
+
+    def name(self) -> str:
+        return self._name
+
+    def node(self) -> "Node":
+        return self._node
+
+    def unexpandedString(self) -> str:  # pylint: disable=invalid-name
+        _count("unexpandedString")
+        return self._value
+
+    def eval(self) -> str:
+        _count("eval")
+        return _expand(self._value, self._node.name())
+
+    def isTimeDependent(self) -> bool:  # pylint: disable=invalid-name
+        _count("isTimeDependent")
+        # Same as Houdini: frame variables and expressions make the value change with time.
+        return _FRAME_REGEX.search(self._value) is not None
+
+    def getReferencedParm(self) -> "Parm":  # pylint: disable=invalid-name
+        _count("getReferencedParm")
+        return self._referenced
+
+    def set(self, value: str):
+        _count("set")
+        self._value = value
+
+    def reference(self, parm: "Parm"):
+        """Make this parm a channel reference to another parm."""
+        self._referenced = parm
+        self._value = parm.unexpandedString()
+
+
+class Node:
+    """hou.Node holding file parms."""
+
+    def __init__(self, path: str, node_type: "NodeType"):
+        self._path = path
+        self._type = node_type
+        self._parms = {}
+
+    def path(self) -> str:
+        return self._path
+
+    def name(self) -> str:
+        return self._path.rsplit("/", 1)[-1]
+
+    def type(self) -> "NodeType":
+        return self._type
+
+    def parm(self, name: str):
+        return self._parms.get(name)
+
+    def parms(self) -> list:
+        return list(self._parms.values())
+
+
+class NodeType:
+    """hou.NodeType which knows its instances."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self.nodes = []
+
+    def name(self) -> str:
+        return self._name
+
+    def instances(self) -> tuple:
+        _count("instances")
+        return tuple(self.nodes)
+
+
+class NodeTypeCategory:
+    """hou.NodeTypeCategory."""
+
+    def __init__(self, name: str):
+        self._name = name
+        self.node_types = {}
+
+    def name(self) -> str:
+        return self._name
+
+    def nodeType(self, name: str):  # pylint: disable=invalid-name
+        return self.node_types.get(name)
+
+
+_CATEGORIES = {name: NodeTypeCategory(name) for name in ("Sop", "Object", "Driver", "Dop", "Lop")}
+
+
+def _expand(value: str, node_name: str = "") -> str:
+    def convert(match):
+        variable = match.group(1)
+        if variable == "OS":
+            return node_name
+        if variable.startswith("F"):
+            return str(FRAME).zfill(int(variable[1:] or 1))
+        return VARIABLES[f"${variable}"]
+    return _VARIABLE_REGEX.sub(convert, value)
+
+
+def clear():
+    """Remove all nodes and call counters."""
+    _NODES.clear()
+    CALLS.clear()
+    for category in _CATEGORIES.values():
+        category.node_types.clear()
+
+
+def add_file_parm(node_path: str, value: str, parm_name: str = "file",
+                  type_name: str = "file", category: str = "Sop") -> Parm:
+    """Add node with a file parm to the scene.
+
+    Args:
+        node_path (str): full path of the node
+        value (str): unexpanded value of the parm
+        parm_name (str): name of the parm
+        type_name (str): name of the node type
+        category (str): name of the node type category
+    Returns:
+        Created Parm.
+    """
+    node_type = _CATEGORIES[category].node_types.setdefault(type_name, NodeType(type_name))
+    node = _NODES.get(node_path)
+    if node is None:
+        node = _NODES[node_path] = Node(node_path, node_type)
+        node_type.nodes.append(node)
+    parm = node._parms[parm_name] = Parm(node, parm_name, value)  # pylint: disable=protected-access
+    return parm
+
+
+def expandString(value: str) -> str:  # pylint: disable=invalid-name
+    """hou.expandString."""
+    _count("expandString")
+    return _expand(value)
+
+
+def hscript(command: str) -> tuple:
+    """hou.hscript, commands are ignored."""
+    _count("hscript")
+    return "", ""
+
+
+def fileReferences() -> tuple:  # pylint: disable=invalid-name
+    """hou.fileReferences, every parm of every node including references."""
+    _count("fileReferences")
+    return tuple((parm, parm.unexpandedString())
+                 for node in _NODES.values() for parm in node.parms())
+
+
+def nodeTypeCategories() -> dict:  # pylint: disable=invalid-name
+    """hou.nodeTypeCategories."""
+    return dict(_CATEGORIES)
+
+
+def node(path: str):
+    """hou.node."""
+    return _NODES.get(path)
+
+
+class Error(Exception):
+    """hou.Error."""
+
+
+class OperationInterrupted(Error):
+    """hou.OperationInterrupted."""
+
+
+class InterruptableOperation:
+    """hou.InterruptableOperation, progress is ignored."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def updateProgress(self, fraction: float):  # pylint: disable=invalid-name
+        """Ignore progress."""
+
+
+updateMode = types.SimpleNamespace(  # pylint: disable=invalid-name
+    AutoUpdate="AutoUpdate", OnMouseUp="OnMouseUp", Manual="Manual")
+_UPDATE_MODE = [updateMode.AutoUpdate]
+
+
+def updateModeSetting() -> str:  # pylint: disable=invalid-name
+    """hou.updateModeSetting."""
+    return _UPDATE_MODE[0]
+
+
+def setUpdateMode(mode: str):  # pylint: disable=invalid-name
+    """hou.setUpdateMode."""
+    _UPDATE_MODE[0] = mode
+
+
+@contextlib.contextmanager
+def _undo_group(label: str = ""):
+    yield
+
+
+undos = types.SimpleNamespace(group=_undo_group)
+
+
+def _confirm(*args, **kwargs) -> bool:
+    return True
+
+
+def _message(*args, **kwargs) -> int:
+    return 0
+
+
+ui = types.SimpleNamespace(displayMessage=_message, displayConfirmation=_confirm)
+severityType = types.SimpleNamespace(  # pylint: disable=invalid-name
+    Message="Message", Warning="Warning", Error="Error")
+
+
+class qt:  # pylint: disable=invalid-name
+    """hou.qt, main window is created on demand and needs QApplication."""
+
+    _main_window = None
+
+    @classmethod
+    def mainWindow(cls):  # pylint: disable=invalid-name
+        """Get hidden main window."""
+        if cls._main_window is None:
+            from PySide2 import QtWidgets  # pylint: disable=import-outside-toplevel
+            cls._main_window = QtWidgets.QMainWindow()
+        return cls._main_window
+
@@ -0,0 +1,226 @@
+"""Benchmarks of the Breakdown on synthetic cache trees with a fake hou module.
+
+Usage from repo root:
+    python benchmarks/run.py
+    python benchmarks/run.py --assets 10000 --versions 50 --frames 24 --save
+    python benchmarks/run.py --strict
+Timings are compared with benchmarks/baseline.json. Stored timings come from one machine,
+so save the baseline on this host first if exit code 1 on regression is wanted with --strict.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(os.path.dirname(BENCHMARKS), "scripts", "python")
+sys.path[:0] = [BENCHMARKS, SCRIPTS, os.path.join(SCRIPTS, "site-packages")]
+
+import fake_hou  # pylint: disable=wrong-import-position
+sys.modules["hou"] = fake_hou
+
+import synthetic  # pylint: disable=wrong-import-position
+from breakdown import engine  # pylint: disable=wrong-import-position
+from breakdown import results  # pylint: disable=wrong-import-position
+from breakdown import retention  # pylint: disable=wrong-import-position
+from config import templates  # pylint: disable=wrong-import-position
+from files import disk  # pylint: disable=wrong-import-position
+from files import houdini  # pylint: disable=wrong-import-position
+from files import store  # pylint: disable=wrong-import-position
+
+BASELINE = os.path.join(BENCHMARKS, "baseline.json")
+
+
+class Timer:
+    """Collects wall time of named phases."""
+
+    def __init__(self):
+        self.timings = {}
+
+    def measure(self, name: str, function, *args):
+        """Run function and store its wall time under the name."""
+        start = time.perf_counter()
+        result = function(*args)
+        self.timings[name] = time.perf_counter() - start
+        return result
+
+
+def get_records(parms) -> list:
+    """Convert PathParms to engine records."""
+    return [engine.Record(parm.get_full_parm_name(), parm.get_raw_path(),
+                          parm.get_expanded_path()) for parm in parms]
+
+
+def update_all(rows: list, parms: dict):
+    """Same as logic.update_all without the dialog."""
+    houdini.set_paths([(parms[row.record.parm_path], path)
+                       for row, path in engine.Engine.plan_update_all(rows)])
+
+
+def delete(plan: engine.DeletePlan) -> disk.DeletionReport:
+    """Same as logic.delete without the dialog."""
+    return disk.delete_files(disk.plan_deletion(plan.paths))
+
+
+def open_session(template, listings: store.ListingStore, records: list) -> list:
+    """Build rows in a new session with the index saved by the previous one."""
+    # Stored listings are loaded per asset root by the engine, like in the dialog.
+    return engine.Engine(template, disk.VersionIndex(listings)).build_rows(records)
+
+
+def populate_table(parms) -> bool:
+    """Fill BreakdownTable with rows, skipped if PySide2 is not available."""
+    try:
+        from PySide2 import QtWidgets  # pylint: disable=import-outside-toplevel
+        from breakdown import logic  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return False
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    _application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    template = templates.get_generic_template()
+    index = disk.VersionIndex()
+    rows = [logic.Row(None, parm, template, index) for parm in parms]
+    table = logic.interface.BreakdownTable()
+    table.update_items(rows)
+    return True
+
+
+def open_dialog():
+    """Same as main.main, returns the dialog as soon as it is shown."""
+    from breakdown import logic  # pylint: disable=import-outside-toplevel
+    return logic.show_dialog()
+
+
+def close_dialog(dialog):
+    """Wait for the scan started by open_dialog and close the dialog."""
+    from PySide2 import QtWidgets  # pylint: disable=import-outside-toplevel
+    # Rescan of the reopened dialog starts from the event loop.
+    QtWidgets.QApplication.processEvents()
+    while dialog.scan is not None:
+        QtWidgets.QApplication.processEvents()
+    dialog.close()
+
+
+def run(args) -> dict:
+    """Build synthetic data and time every phase.
+
+    Args:
+        args (argparse.Namespace): parsed command line arguments
+    Returns:
+        Dict of phase: seconds.
+    """
+    timer = Timer()
+    root = tempfile.mkdtemp(prefix="breakdown_bench_")
+    # Index of the dialog is built on import of breakdown.logic, the user cache is not touched.
+    os.environ["BREAKDOWN_INDEX"] = os.path.join(root, "dialog.sqlite")
+    try:
+        synthetic.build_tree(root, args.assets, args.versions, args.frames)
+        setters = synthetic.build_scene(
+            root, args.assets, args.versions, args.parms_per_asset, args.chain_length)
+        values = {parm: parm.unexpandedString() for parm in setters}
+
+        parms = timer.measure("get_parms[references]", houdini.get_parms,
+                              houdini.HARVEST_REFERENCES)
+        fake_hou.CALLS.clear()
+        timer.measure("get_parms[nodes]", houdini.get_parms, houdini.HARVEST_NODES)
+        print(f"hou calls of get_parms[nodes]: {fake_hou.CALLS}")
+        records = get_records(parms)
+        by_path = {parm.get_full_parm_name(): parm for parm in parms}
+
+        breakdown = engine.Engine(templates.get_generic_template())
+        rows = timer.measure("rows[cold]", breakdown.build_rows, records)
+        rows = timer.measure("rows[warm]", breakdown.build_rows, records)
+        # Same as warm, but every path is dispatched between all templates of the show.
+        shows = engine.Engine(templates.get_templates(), breakdown.index)
+        timer.measure("rows[registry]", shows.build_rows, records)
+        listings = store.ListingStore(os.path.join(root, "index.sqlite"))
+        engine.Engine(breakdown.template, disk.VersionIndex(listings)).build_rows(records)
+        timer.measure("rows[stored]", open_session, breakdown.template, listings, records)
+        timer.measure("export", results.write_results, os.devnull, rows)
+        if populate_table(parms):
+            timer.measure("table", populate_table, parms)
+            close_dialog(timer.measure("open[cold]", open_dialog))
+            close_dialog(timer.measure("open[warm]", open_dialog))
+
+        timer.measure("update_all", update_all, rows, by_path)
+        for parm, value in values.items():
+            parm.set(value)
+        rows = breakdown.build_rows(get_records(houdini.get_parms()))
+
+        policy = retention.Policy(keep_last=3, newer_than_days=14, keep_previous=True)
+        timer.measure("plan_retention", engine.Engine.plan_policy, rows, policy)
+        plan = timer.measure("plan_elders", engine.Engine.plan_elders, rows)
+        report = timer.measure("delete_elder", delete, plan)
+        print(f"delete_elder: {len(report.deleted)} files")
+        rows = breakdown.build_rows(records)
+        plan = timer.measure("plan_unused", engine.Engine.plan_unused, rows)
+        report = timer.measure("delete_unused", delete, plan)
+        print(f"delete_unused: {len(report.deleted)} files")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return timer.timings
+
+
+def compare(timings: dict, baseline: dict, tolerance: float) -> list:
+    """Print timings next to the baseline.
+
+    Args:
+        timings (dict): phase: seconds of this run
+        baseline (dict): phase: seconds of the stored run
+        tolerance (float): allowed slowdown, 0.25 means 25%
+    Returns:
+        List of phases slower than baseline by more than tolerance.
+    """
+    regressions = []
+    for phase, seconds in timings.items():
+        stored = baseline.get(phase)
+        if stored is None:
+            print(f"{phase:24} {seconds:9.4f}s")
+            continue
+        ratio = seconds / stored if stored else 1.0
+        # Very short phases are too noisy to be compared.
+        regressed = ratio > 1 + tolerance and seconds - stored > 0.01
+        if regressed:
+            regressions.append(phase)
+        print(f"{phase:24} {seconds:9.4f}s  baseline {stored:9.4f}s  x{ratio:5.2f}"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main() -> int:
+    """Starting point of benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--assets", type=int, default=300)
+    parser.add_argument("--versions", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--parms-per-asset", type=int, default=3)
+    parser.add_argument("--chain-length", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store timings as new baseline")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit with code 1 on regression, the baseline must be from this host")
+    args = parser.parse_args()
+    key = (f"assets={args.assets},versions={args.versions},frames={args.frames},"
+           f"parms_per_asset={args.parms_per_asset},chain_length={args.chain_length}")
+
+    timings = run(args)
+    baselines = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baselines = json.load(file)
+    print(key)
+    regressions = compare(timings, baselines.get(key, {}), args.tolerance)
+    if args.save:
+        baselines[key] = timings
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baselines, file, indent=4, sort_keys=True)
+    return 1 if regressions and args.strict else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
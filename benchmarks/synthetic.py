@@ -0,0 +1,71 @@
+"""Synthetic $JOB trees and scenes for benchmarks."""
+
+import os
+
+import fake_hou
+
+STEPS = ("anim", "fx", "lighting")
+
+
+def get_asset(index: int) -> (str, str):
+    """Get step and name of the asset with given index."""
+    return STEPS[index % len(STEPS)], f"asset{index:05d}"
+
+
+def build_tree(root: str, assets: int, versions: int, frames: int):
+    """Create $JOB/{step}/{asset}/vNNN/{asset}.{frame}.bgeo.sc tree with empty files.
+
+    Args:
+        root (str): $JOB directory
+        assets (int): number of assets
+        versions (int): number of versions per asset
+        frames (int): number of frames per version
+    Returns:
+
+    """
+    for asset_index in range(assets):
+        step, asset = get_asset(asset_index)
+        for version in range(1, versions + 1):
+            directory = os.path.join(root, step, asset, f"v{version:03d}")
+            os.makedirs(directory, exist_ok=True)
+            for frame in range(1, frames + 1):
+                with open(os.path.join(directory, f"{asset}.{frame:04d}.bgeo.sc"), "wb") as file:
+                    file.write(b"\0" * 64)
+
+
+def build_scene(root: str, assets: int, versions: int, parms_per_asset: int,
+                chain_length: int) -> list:
+    """Fill fake_hou with File SOPs pointing to synthetic assets.
+
+    Every asset is used by parms_per_asset parms with different versions, the first of them
+    is also referenced by a chain of chain_length parms.
+
+    Args:
+        root (str): $JOB directory
+        assets (int): number of assets
+        versions (int): number of versions per asset
+        parms_per_asset (int): number of parms using every asset
+        chain_length (int): number of parms referencing the first parm of every asset
+    Returns:
+        List of setter parms.
+    """
+    fake_hou.clear()
+    fake_hou.VARIABLES["$JOB"] = root.replace("\\", "/")
+    fake_hou.VARIABLES["$HIP"] = root.replace("\\", "/") + "/hip"
+    setters = []
+    for asset_index in range(assets):
+        step, asset = get_asset(asset_index)
+        for parm_index in range(parms_per_asset):
+            version = 1 + (asset_index + parm_index * 7) % versions
+            value = f"$JOB/{step}/{asset}/v{version:03d}/{asset}.$F4.bgeo.sc"
+            parm = fake_hou.add_file_parm(f"/obj/{asset}/file{parm_index}", value)
+            setters.append(parm)
+            if parm_index:
+                continue
+            referenced = parm
+            for chain_index in range(chain_length):
+                link = fake_hou.add_file_parm(
+                    f"/obj/{asset}/ref{chain_index}", "", type_name="null")
+                link.reference(referenced)
+                referenced = link
+    return setters
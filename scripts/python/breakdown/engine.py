@@ -0,0 +1,715 @@
+"""Headless part of the Breakdown: rows, versions and deletion plans.
+
+Works on a manifest of records read from the scene, so it does not need hou or PySide2
+and can run on farm nodes or in tests against a fake hou.
+"""
+import functools
+import os
+import re
+import threading
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional, Union
+
+from breakdown import profiling
+from breakdown import retention
+from config import wrappers
+from files import disk
+
+
+# Status of the file used by a row, lower is worse, so the worst row of a group is min().
+STATUS_BROKEN = 0
+STATUS_OUTDATED = 1
+STATUS_UP_TO_DATE = 2
+STATUS_NAMES = {
+    STATUS_BROKEN: "broken",
+    STATUS_OUTDATED: "outdated",
+    STATUS_UP_TO_DATE: "up to date",
+}
+
+
+class Record(NamedTuple):
+    """One file parm of the scene."""
+    parm_path: str
+    raw_path: str
+    expanded_path: str
+
+
+# $F, $F4 or ${F4} but not $FPS, $FSTART and other variables starting with F.
+_FRAME_REGEX = re.compile(r"\$(?:F(\d?)(?![A-Za-z0-9_])|\{F(\d?)\})")
+_VARIABLE_REGEX = re.compile(r"\$\{?[A-Za-z_][A-Za-z0-9_]*\}?|`[^`]*`")
+
+
+class Frame(NamedTuple):
+    """Frame variable of a file sequence and place of the frame number in its file name."""
+    token: str
+    width: int
+    suffix: int
+
+    def split(self, path: str) -> (str, str, str):
+        """Split expanded path of any frame to (head, frame number, tail)."""
+        end = len(path) - self.suffix
+        return path[:end - self.width], path[end - self.width:end], path[end:]
+
+
+def has_frame_variable(raw_path: str) -> bool:
+    """Check if the parm value has a frame variable, Houdini reports such parms as time dependent.
+
+    Args:
+        raw_path (str): parm value with variables
+    Returns:
+        True if any frame variable such as $F4 is used.
+    """
+    return _FRAME_REGEX.search(raw_path) is not None
+
+
+def find_frame(raw_path: str, expanded_path: str) -> Optional[Frame]:
+    """Find frame number in file name of the expanded path by frame variable of the raw path.
+
+    Args:
+        raw_path (str): parm value with variables
+        expanded_path (str): parm value evaluated at the current frame
+    Returns:
+        Frame if the file name is a sequence, None otherwise.
+    """
+    token, regex = _get_name_regex(raw_path.replace("\\", "/").rsplit("/", 1)[-1])
+    if token is None:
+        return None
+    name = expanded_path.replace("\\", "/").rsplit("/", 1)[-1]
+    match = regex.fullmatch(name)
+    if match is None:
+        return None
+    return Frame(token, match.end("frame") - match.start("frame"), len(name) - match.end("frame"))
+
+
+@functools.lru_cache(maxsize=None)
+def _get_name_regex(raw_name: str) -> (Optional[str], Optional[re.Pattern]):
+    pattern = ""
+    token = None
+    position = 0
+    for match in re.finditer(f"{_FRAME_REGEX.pattern}|{_VARIABLE_REGEX.pattern}", raw_name):
+        pattern += re.escape(raw_name[position:match.start()])
+        if token is None and _FRAME_REGEX.fullmatch(match.group(0)):
+            token = match.group(0)
+            pattern += r"(?P<frame>-?\d+)"
+        else:
+            pattern += ".*?"
+        position = match.end()
+    if token is None:
+        return None, None
+    return token, re.compile(pattern + re.escape(raw_name[position:]))
+
+
+def get_variant(template: wrappers.TemplateWrapper, fields: dict, frame: Optional[Frame]) -> str:
+    """Get key shared by all versions of the same file of the asset.
+
+    Args:
+        template (wrappers.TemplateWrapper): template of the path
+        fields (dict): fields of any version of the file
+        frame (Optional[Frame]): frame number in the path if the file is a sequence
+    Returns:
+        Path with zero version, frame number of sequences is replaced by the frame variable,
+        so parms evaluated at different frames get the same key.
+    """
+    variant = template.format(dict(fields, version=0))
+    if frame is None:
+        return variant
+    head, _, tail = frame.split(variant)
+    return f"{head}{frame.token}{tail}"
+
+
+class Sequence(NamedTuple):
+    """Frames of one file sequence found in a single listing of its directory."""
+    directory: str
+    names: tuple
+    first: int
+    last: int
+    size: int
+
+    def __str__(self) -> str:
+        return f"{self.first}-{self.last} ({len(self.names)} frames)"
+
+    def get_paths(self) -> list[str]:
+        """Get paths of all frames."""
+        return [f"{self.directory}/{name}" for name in self.names]
+
+
+def find_sequence(path: str, frame: Frame, index: disk.VersionIndex) -> Optional[Sequence]:
+    """Find all frames of the sequence in the directory of the path.
+
+    Args:
+        path (str): expanded path of any frame of the sequence
+        frame (Frame): place of the frame number in the path
+        index (disk.VersionIndex): index to read the directory from
+    Returns:
+        Sequence sorted by frame, None if no frame was found.
+    """
+    head, _, tail = frame.split(path.replace("\\", "/"))
+    directory, _, prefix = head.rpartition("/")
+    regex = _get_sequence_regex(prefix, tail)
+    files = index.listdir(directory).files
+    frames = []
+    for name in files:
+        match = regex.fullmatch(name)
+        if match:
+            frames.append((int(match.group(1)), name))
+    if not frames:
+        return None
+    frames.sort()
+    return Sequence(directory, tuple(name for _, name in frames), frames[0][0], frames[-1][0],
+                    sum(files[name] for _, name in frames))
+
+
+@functools.lru_cache(maxsize=4096)
+def _get_sequence_regex(prefix: str, tail: str) -> re.Pattern:
+    return re.compile(f"{re.escape(prefix)}(-?\\d+){re.escape(tail)}")
+
+
+class Parsed(NamedTuple):
+    """Values of the expanded path of one row, all None for unmanaged rows."""
+    template: Optional[wrappers.TemplateWrapper]
+    fields: dict
+    frame: Optional[Frame]
+    version: Optional[int]
+    variant: Optional[str]
+
+
+class Row:
+    """Asset version used by one parm and all versions of the asset found on disk.
+
+    Paths matching no template are kept as unmanaged rows: they have no version,
+    no versions are looked for and nothing is ever planned for deletion or update.
+    Status is computed from the listings of the refresh and kept until the next one,
+    so rendering the row never touches the file system.
+    """
+
+    def __init__(
+            self,
+            record: Record,
+            templates: Union[wrappers.TemplateWrapper, wrappers.TemplateRegistry],
+            index: disk.VersionIndex,
+            assets: Optional["Assets"] = None):
+        self.record = record
+        self._templates = templates
+        self._assets = assets if assets is not None else Assets()
+        self.asset = None
+        # Values of the path and versions of its variant are replaced at once by every refresh.
+        self._parsed = Parsed(None, {}, None, None, None)
+        self._found = _NOT_FOUND
+        self.status = STATUS_BROKEN
+        self.refresh(index)
+
+    @property
+    def template(self) -> Optional[wrappers.TemplateWrapper]:
+        """Template matching the path, None for unmanaged rows."""
+        return self._parsed.template
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version used by the parm, None for unmanaged rows."""
+        return self._parsed.version
+
+    @property
+    def variant(self) -> Optional[str]:
+        """Path of the variant with zero version, see get_variant."""
+        return self._parsed.variant
+
+    @property
+    def versions(self) -> list[int]:
+        """Sorted versions of the variant found on disk."""
+        return self._found.versions
+
+    @property
+    def sizes(self) -> dict:
+        """Bytes of every version found on disk."""
+        return self._found.sizes
+
+    @property
+    def history(self) -> retention.VersionSet:
+        """Versions found on disk with their mtimes and tags."""
+        return self._found.history
+
+    def refresh(self, index: disk.VersionIndex):
+        """Recompute fields and versions from the record and the version index.
+
+        Args:
+            index (disk.VersionIndex): index to read versions of the asset from
+        Returns:
+
+        """
+        path = self.record.expanded_path
+        with profiling.PROFILER.phase("parse"):
+            template = self._templates.match(path)
+            fields = template.parse(path) if template is not None else {}
+        frame = find_frame(self.record.raw_path, path)
+        if template is None:
+            self._set_unmanaged(frame)
+            exists = index.getsize(path) is not None
+            self.status = STATUS_UP_TO_DATE if exists else STATUS_BROKEN
+            return
+        self._parsed = Parsed(template, fields, frame, int(fields["version"]),
+                              get_variant(template, fields, frame))
+
+        root, folder = template.get_version_folders(fields)
+        asset = self._assets.get(root, folder)
+        if asset is not self.asset:
+            if self.asset is not None:
+                self.asset.discard(self)
+            asset.add(self)
+            self.asset = asset
+        with profiling.PROFILER.phase("versions"):
+            self._found = asset.find(self.variant, fields, template, index, frame)
+        # Any frame is enough for sequences, sizes have only versions found on disk.
+        if self.version not in self.sizes:
+            self.status = STATUS_BROKEN
+        elif self.is_outdated():
+            self.status = STATUS_OUTDATED
+        else:
+            self.status = STATUS_UP_TO_DATE
+
+    def _set_unmanaged(self, frame: Optional[Frame]):
+        self._parsed = Parsed(None, {}, frame, None, None)
+        if self.asset is not None:
+            self.asset.discard(self)
+            self.asset = None
+        self._found = _NOT_FOUND
+
+    def release(self):
+        """Stop counting the version of the row in its asset, when the row is not needed any more.
+
+        Reclaimable size and plans of rows of the asset do not protect the version after that.
+        """
+        if self.asset is not None:
+            self.asset.discard(self)
+
+    def is_managed(self) -> bool:
+        """Check if the path matches any template."""
+        return self.template is not None
+
+    def get_asset(self) -> str:
+        """Get key of the asset shared by all rows pointing to any of its versions.
+
+        Args:
+
+        Returns:
+            Expanded path to the directory holding all versions of the asset,
+            directory of the file for unmanaged rows.
+        """
+        if self.asset is None:
+            return os.path.dirname(self.record.expanded_path.replace("\\", "/"))
+        return self.asset.key
+
+    def get_fields(self) -> dict:
+        """Get copy of fields parsed from the expanded path."""
+        return self._parsed.fields.copy()
+
+    def get_title(self) -> str:
+        """Get short name of the asset: its step or shot and name.
+
+        Args:
+
+        Returns:
+            Name of the asset, "unmanaged" and file name for unmanaged rows.
+        """
+        if self.template is None:
+            return f"unmanaged: {os.path.basename(self.record.expanded_path)}"
+        fields = self._parsed.fields
+        group = fields.get("step") or fields.get("shot") or self.template.name
+        return f'{group}: {fields.get("asset") or os.path.basename(self.get_asset())}'
+
+    def get_path(self, version: int) -> str:
+        """Get expanded path of the given version of the asset.
+
+        Args:
+            version (int): version of the asset
+        Returns:
+            Expanded path formatted by the template, frame variable of a sequence is kept.
+        """
+        path = self.template.format(dict(self._parsed.fields, version=version))
+        frame = self._parsed.frame
+        if frame is None:
+            return path
+        head, _, tail = frame.split(path)
+        return f"{head}{frame.token}{tail}"
+
+    def get_paths(self, versions: Iterable[int]) -> list[str]:
+        """Get expanded paths of all files of the given versions of the asset.
+
+        Args:
+            versions (Iterable[int]): versions found on disk
+        Returns:
+            List of expanded paths in the same order, all frames of sequences are included.
+        """
+        if self._parsed.frame is not None:
+            sequences = self._found.sequences
+            return [path for version in versions for path in sequences[version].get_paths()]
+        # Paths of found versions are formatted once per variant by Asset.find.
+        paths = self._found.paths
+        return [paths[version] if version in paths
+                else self.template.format(dict(self._parsed.fields, version=version))
+                for version in versions]
+
+    def is_outdated(self) -> bool:
+        """Check if the last version found on disk is not the one used by parm."""
+        if not self.is_managed():
+            return False
+        return not self.versions or self.versions[-1] != self.version
+
+    def get_size(self) -> int:
+        """Get size of all versions of the file used by this parm in bytes."""
+        return sum(self.sizes.values())
+
+    def get_reclaimable(self) -> int:
+        """Get size of versions of the file not used by any parm of the asset in bytes."""
+        if not self.is_managed():
+            return 0
+        used = self.asset.get_in_use(self.variant)
+        return sum(size for version, size in self.sizes.items() if version not in used)
+
+    def get_version_range(self) -> str:
+        """Just getter method that converts list[int] field to str.
+
+        Args:
+
+        Returns:
+            String with all versions that exist for the asset.
+        """
+        return str(self.history)
+
+    def get_elders(self) -> (str, list[str]):
+        """Get elder versions of the asset than used by this parm.
+
+        Versions used by other parms of the asset are kept.
+
+        Args:
+
+        Returns:
+            Tuple of (current_version_path, [paths_to_elder_versions])
+        """
+        if not self.is_managed():
+            return self.record.expanded_path, []
+        used = self.asset.get_in_use(self.variant)
+        to_delete = self.get_paths(
+            version for version in self.versions if version < self.version and version not in used)
+        return self.record.expanded_path, to_delete
+
+    def get_unused(self) -> (str, list[str]):
+        """Get not used by this parm versions of the asset.
+
+        Versions used by other parms of the asset are kept.
+
+        Args:
+
+        Returns:
+            Tuple of (current_version_path, [paths_to_unused_versions])
+        """
+        if not self.is_managed():
+            return self.record.expanded_path, []
+        used = self.asset.get_in_use(self.variant)
+        to_delete = self.get_paths(version for version in self.versions if version not in used)
+        return self.record.expanded_path, to_delete
+
+
+class Found(NamedTuple):
+    """Versions of one variant of the asset found on disk."""
+    versions: list
+    sequences: dict
+    sizes: dict
+    paths: dict
+    history: retention.VersionSet
+
+
+# Versions of unmanaged rows, no versions are looked for.
+_NOT_FOUND = Found([], {}, {}, {}, retention.VersionSet(()))
+
+
+class Asset:
+    """All versions of one asset found on disk and rows using them.
+
+    Versions are found once per variant of the asset (the same file with any version),
+    so all parms pointing to it share the result.
+    """
+
+    def __init__(self, key: str, folder: re.Pattern):
+        self.key = key
+        self._folder = folder
+        self._rows = {}
+        self._found = {}
+        self._lock = threading.Lock()
+
+    @property
+    def rows(self) -> list[Row]:
+        """Rows using any version of the asset, in order they were added."""
+        with self._lock:
+            return list(self._rows)
+
+    def add(self, row: Row):
+        """Start tracking version used by the row."""
+        with self._lock:
+            self._rows[row] = None
+
+    def discard(self, row: Row):
+        """Stop tracking the row, for example when it points to another asset now."""
+        with self._lock:
+            self._rows.pop(row, None)
+
+    def find(self, variant: str, fields: dict, template: wrappers.TemplateWrapper,
+             index: disk.VersionIndex, frame: Optional[Frame] = None) -> "Found":
+        """Find versions of the variant which exist on disk, once per refresh of index.
+
+        Every version directory is listed once, frames of sequences are collapsed to Sequence.
+        Sizes are taken from the listings, so files are not checked one by one.
+
+        Args:
+            variant (str): path of the variant with zero version, see Row.variant
+            fields (dict): fields of any path of the variant
+            template (wrappers.TemplateWrapper): template of the path
+            index (disk.VersionIndex): index to read versions from
+            frame (Optional[Frame]): frame number in the path if variant is a sequence
+        Returns:
+            Found versions, it is shared and must not be changed.
+        """
+        with self._lock:
+            cached = self._found.get(variant)
+            if cached is not None and cached[0] == index.generation:
+                return cached[1]
+            # Stored listings of all versions are loaded in one query, only the first time.
+            index.preload(self.key)
+            candidates = index.get_versions(self.key, self._folder)
+            paths = template.format_many(
+                dict(fields, version=version) for version in candidates)
+            if frame is None:
+                sequences = {}
+                sizes, found_paths, directories = _find_files(candidates, paths, index)
+            else:
+                found_paths = {}
+                sequences, sizes, directories = _find_sequences(candidates, paths, frame, index)
+            found = Found(list(sizes), sequences, sizes, found_paths,
+                          _get_history(sizes, directories, index))
+            self._found[variant] = (index.generation, found)
+            return found
+
+    def get_in_use(self, variant: Optional[str] = None) -> set[int]:
+        """Get versions used by rows of the asset.
+
+        Args:
+            variant (Optional[str]): only rows of this variant, all rows if not set
+        Returns:
+            Set of versions.
+        """
+        return {row.version for row in self.rows if variant is None or row.variant == variant}
+
+
+def _find_files(versions: list[int], paths: list[str], index: disk.VersionIndex
+                ) -> (dict, dict, dict):
+    # Sizes, paths and directories of versions whose file is in the listing of its directory.
+    sizes = {}
+    found_paths = {}
+    directories = {}
+    for version, path in zip(versions, paths):
+        size = index.getsize(path)
+        if size is not None:
+            sizes[version] = size
+            found_paths[version] = path
+            directories[version] = os.path.dirname(path)
+    return sizes, found_paths, directories
+
+
+def _find_sequences(versions: list[int], paths: list[str], frame: Frame,
+                    index: disk.VersionIndex) -> (dict, dict, dict):
+    # Frames of every version are collapsed to one Sequence.
+    sequences = {}
+    sizes = {}
+    directories = {}
+    for version, path in zip(versions, paths):
+        sequence = find_sequence(path, frame, index)
+        if sequence is not None:
+            sequences[version] = sequence
+            sizes[version] = sequence.size
+            directories[version] = sequence.directory
+    return sequences, sizes, directories
+
+
+def _get_history(sizes: dict, directories: dict, index: disk.VersionIndex
+                 ) -> retention.VersionSet:
+    # Directories are already listed, so times and tags cost no file system calls.
+    times = {version: index.get_mtime(directory) for version, directory in directories.items()}
+    tagged = [version for version, directory in directories.items()
+              if retention.TAG_FILE in index.listdir(directory).files]
+    return retention.VersionSet(sizes, times, tagged)
+
+
+class Assets:
+    """Thread safe registry of assets shared by rows of one scan."""
+
+    def __init__(self):
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, folder: re.Pattern) -> Asset:
+        """Get asset by its key, it is created on first request.
+
+        Args:
+            key (str): expanded path to the directory holding all versions of the asset
+            folder (re.Pattern): regex of version entries in the directory
+        Returns:
+            Asset shared by all rows asking for the key.
+        """
+        with self._lock:
+            asset = self._assets.get(key)
+            if asset is None:
+                asset = self._assets[key] = Asset(key, folder)
+            return asset
+
+    def values(self) -> list[Asset]:
+        """Get all assets in order they were requested."""
+        with self._lock:
+            return list(self._assets.values())
+
+
+def format_versions(versions: list[int]) -> str:
+    """Render sorted versions to str.
+
+    Args:
+        versions (list[int]): sorted versions
+    Returns:
+        String with all versions, consecutive ones collapsed, such as 1-6, 8, 10-12.
+    """
+    return str(retention.VersionSet(versions))
+
+
+class DeletePlan(NamedTuple):
+    """Paths to delete and assets they belong to."""
+    paths: set
+    assets: set
+
+
+class Engine:
+    """Builds rows from records and plans bulk actions over them."""
+
+    def __init__(self, template: Union[wrappers.TemplateWrapper, wrappers.TemplateRegistry],
+                 index: Optional[disk.VersionIndex] = None):
+        self.template = template
+        self.index = index if index is not None else disk.VersionIndex()
+        self.assets = Assets()
+
+    def build_row(self, record: Iterable[str]) -> Row:
+        """Build row from one record of (parm path, raw path, expanded path).
+
+        Args:
+            record (Iterable[str]): Record or any tuple of the same values
+        Returns:
+            Row with versions of the asset found on disk.
+        """
+        return Row(Record(*record), self.template, self.index, self.assets)
+
+    def build_rows(self, records: Iterable[Iterable[str]]) -> list[Row]:
+        """Build rows from the manifest, every directory is listed only once.
+
+        Args:
+            records (Iterable[Iterable[str]]): records of (parm path, raw path, expanded path)
+        Returns:
+            List of rows in the same order.
+        """
+        self.index.refresh()
+        self.assets = Assets()
+        rows = [self.build_row(record) for record in records]
+        self.index.save()
+        return rows
+
+    def iter_rows(self, records: Iterable[Iterable[str]], keep: bool = True) -> Iterator[Row]:
+        """Build rows one by one while records are read, for example to stream them to a file.
+
+        Args:
+            records (Iterable[Iterable[str]]): records of (parm path, raw path, expanded path)
+            keep (bool): keep rows referenced by assets of the engine, which count versions
+                used by all of them, otherwise every row is released when the next one is asked
+        Returns:
+            Iterator of rows in the same order, the index is saved when it is exhausted.
+        """
+        self.index.refresh()
+        self.assets = Assets()
+        for record in records:
+            row = self.build_row(record)
+            yield row
+            if not keep:
+                row.release()
+        self.index.save()
+
+    @staticmethod
+    def plan_elders(rows: Iterable[Row]) -> DeletePlan:
+        """Plan deletion of versions elder than used, versions used by any row are kept.
+
+        Args:
+            rows (Iterable[Row]): rows to plan deletion for
+        Returns:
+            DeletePlan with paths and assets affected.
+        """
+        return _plan(rows, _select_elders)
+
+    @staticmethod
+    def plan_unused(rows: Iterable[Row]) -> DeletePlan:
+        """Plan deletion of versions not used, versions used by any row are kept.
+
+        Args:
+            rows (Iterable[Row]): rows to plan deletion for
+        Returns:
+            DeletePlan with paths and assets affected.
+        """
+        return _plan(rows, _select_unused)
+
+    @staticmethod
+    def plan_policy(rows: Iterable[Row], policy: retention.Policy,
+                    now: Optional[float] = None) -> DeletePlan:
+        """Plan deletion of versions kept by no rule of the policy, see retention.Policy.
+
+        Args:
+            rows (Iterable[Row]): rows to plan deletion for
+            policy (retention.Policy): rules of versions to keep
+            now (Optional[float]): time.time() to count days of the policy from, now if not set
+        Returns:
+            DeletePlan with paths and assets affected.
+        """
+        return _plan(rows, functools.partial(policy.select, now=now))
+
+    @staticmethod
+    def plan_update_all(rows: Iterable[Row]) -> list[tuple[Row, str]]:
+        """Plan update of every outdated row to the last version found.
+
+        Args:
+            rows (Iterable[Row]): rows to update
+        Returns:
+            List of (row, new expanded path).
+        """
+        return [(row, row.get_path(row.versions[-1]))
+                for row in rows if row.versions and row.versions[-1] != row.version]
+
+
+def _select_elders(versions: retention.VersionSet, used: set[int]) -> list[int]:
+    last_used = max(used)
+    return [version for version in versions.versions
+            if version < last_used and version not in used]
+
+
+def _select_unused(versions: retention.VersionSet, used: set[int]) -> list[int]:
+    return [version for version in versions.versions if version not in used]
+
+
+def _plan(rows: Iterable[Row], select: Callable) -> DeletePlan:
+    # Rows are grouped by variant of asset in one pass, so only versions of every variant
+    # are formatted and not versions of every row.
+    groups = {}
+    for row in rows:
+        if not row.is_managed():
+            continue
+        group = groups.get(row.variant)
+        if group is None:
+            groups[row.variant] = (row, {row.version})
+        else:
+            group[1].add(row.version)
+    to_delete = set()
+    assets = set()
+    for row, used in groups.values():
+        versions = select(row.history, used)
+        if versions:
+            to_delete.update(row.get_paths(versions))
+            assets.add(row.get_asset())
+    return DeletePlan(to_delete, assets)
@@ -1,32 +1,318 @@
-"""Logic module which connects ui, config and files modules."""
-import glob
+"""Logic module which connects ui, engine, config and files modules."""
 import os
-import re
-from typing import Iterable
+import time
+from typing import Iterable, Optional, Union
 
-from PySide2 import QtWidgets
+from PySide2 import QtCore
 import hou  # pylint: disable=import-error
 
+from breakdown import engine
+from breakdown import profiling
+from breakdown import project
+from breakdown import results
+from breakdown import retention
+from breakdown import watcher
+from breakdown import worker
 from ui import interface
 from config import templates
 from config import wrappers
+from files import disk
 from files import houdini
+from files import store
+from files import trash
+
+# Listings of asset directories are kept between refreshes and sessions (see files.store)
+# and rescanned only when changed.
+VERSION_INDEX = disk.VersionIndex(store.get_store())
+# Dialog is created once per Houdini session and reused by every click of the shelf tool.
+_DIALOG = None
+# Batches of every quarantine of the session, the last one is restored by Undo delete.
+_QUARANTINED = []
+# Items of the status filter of the dialog: (label, statuses shown or None for all rows).
+STATUS_FILTERS = [
+    ("All", None),
+    ("Broken", {engine.STATUS_BROKEN}),
+    ("Outdated", {engine.STATUS_OUTDATED}),
+    ("Broken or outdated", {engine.STATUS_BROKEN, engine.STATUS_OUTDATED}),
+    ("Up to date", {engine.STATUS_UP_TO_DATE}),
+]
+
+
+def update_items(dialog: interface.Dialog, keep_rows: bool = False):
+    """Update items in BreakdownTable of 'dialog' by reparsing the scene.
 
+    Scene is read right away, rows are built in background and streamed into the table.
 
-def update_items(dialog: interface.Dialog):
-    """Update items in BreakdownTable of 'dialog' by reparsing the scene.
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
+        keep_rows (bool): keep showing current rows until the scan is finished and replace
+            them all at once, instead of streaming new rows into the emptied table
+    """
+    # Files matching no template of the show are shown as unmanaged rows.
+    registry = templates.get_templates()
+    # Run of the profiler is finished by _scan_finished when all rows are built.
+    profiling.PROFILER.reset()
+    # Scene is read on the main thread in one pass, file system and parsing go to the worker.
+    with profiling.PROFILER.phase("harvest"):
+        parms = houdini.get_parms()
+    cancel_scan(dialog)
+    # Every directory is listed again by the scan.
+    dialog.changed_directories = set()
+    VERSION_INDEX.refresh()
+    if not keep_rows:
+        dialog.rows = []
+        show_rows(dialog)
+    assets = engine.Assets()
+    scan = worker.Scan(
+        parms, lambda parm: Row(dialog, parm, registry, VERSION_INDEX, assets), dialog)
+    dialog.scan = scan
+    if keep_rows:
+        found = []
+        scan.rows_ready.connect(lambda rows: found.extend(rows) if dialog.scan is scan else None)
+        scan.finished.connect(lambda: _replace_rows(dialog, scan, found))
+    else:
+        scan.rows_ready.connect(lambda rows: _append_rows(dialog, scan, rows))
+    scan.progress.connect(
+        lambda done, total: dialog.set_progress(done, total) if dialog.scan is scan else None)
+    scan.failed.connect(_scan_failed)
+    scan.finished.connect(lambda: _scan_finished(dialog, scan))
+    dialog.set_scanning(True)
+    scan.start()
+
+
+def cancel_scan(dialog: interface.Dialog):
+    """Stop background scan of the dialog if it is running. Rows found so far are kept.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of the scan
+    """
+    if dialog.scan is not None:
+        dialog.scan.cancel()
+        dialog.scan.deleteLater()
+        dialog.scan = None
+        VERSION_INDEX.save()
+    if dialog.watched_refresh is not None:
+        dialog.watched_refresh.cancel()
+        dialog.watched_refresh.deleteLater()
+        dialog.watched_refresh = None
+    dialog.set_scanning(False)
+
+
+def _replace_rows(dialog: interface.Dialog, scan: worker.Scan, rows: list):
+    # Connected before _scan_finished, so it still sees the scan as running.
+    # Failed scan is cancelled by its worker, current rows are kept instead of partial ones.
+    if dialog.scan is scan and not scan.worker.is_cancelled():
+        with profiling.PROFILER.phase("table"):
+            dialog.rows = rows
+            show_rows(dialog)
+
+
+def _append_rows(dialog: interface.Dialog, scan: worker.Scan, rows: list):
+    if dialog.scan is scan:
+        with profiling.PROFILER.phase("table"):
+            dialog.rows.extend(rows)
+            new, changed = _get_items(dialog, rows)
+            dialog.table.append_items(new)
+            dialog.table.update_rows(changed)
+
+
+def show_rows(dialog: interface.Dialog):
+    """Fill the table with all rows of the dialog, collapsed to assets if grouping is on.
 
     Args:
         dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
     """
-    # FIXME: files outside of $JOB are not supported in this version
-    #        they will raise error of missmatch with template
-    template = templates.get_generic_template()
-    parms = houdini.get_parms()
-    rows = []
-    for parm in parms:
-        rows.append(Row(dialog, parm, template))
-    dialog.table.update_items(rows)
+    dialog.groups = {}
+    dialog.table.update_items(_get_items(dialog, dialog.rows)[0])
+
+
+def _get_items(dialog: interface.Dialog, rows: Iterable["Row"]) -> (list, list):
+    """Add rows to groups of the dialog.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of the groups
+        rows (Iterable[Row]): rows to add
+    Returns:
+        Tuple of ([new items of the table], [items of the table changed by rows])
+    """
+    if not dialog.group_by_asset.isChecked():
+        return list(rows), []
+    new = {}
+    changed = {}
+    for row in rows:
+        group = dialog.groups.get(row.get_asset())
+        if group is None:
+            group = dialog.groups[row.get_asset()] = AssetRow(dialog)
+            new[group] = None
+        elif group not in new:
+            changed[group] = None
+        group.rows[row] = None
+    return list(new), list(changed)
+
+
+def _scan_finished(dialog: interface.Dialog, scan: worker.Scan):
+    if dialog.scan is scan:
+        dialog.scan = None
+        dialog.set_scanning(False)
+        scan.deleteLater()
+        VERSION_INDEX.save()
+        dialog.set_stats(profiling.PROFILER.finish("refresh"))
+        _update_watched(dialog)
+        _replay_changes(dialog)
+
+
+def set_watching(dialog: interface.Dialog, enabled: bool):
+    """Start or stop refreshing assets of the table when their directories change.
+
+    Mode of watching is taken from $BREAKDOWN_WATCH, see watcher module.
+
+    Args:
+        dialog (interface.Dialog): Dialog to refresh
+        enabled (bool): start or stop watching
+    """
+    if dialog.watcher is not None:
+        dialog.watcher.stop()
+        dialog.watcher.deleteLater()
+        dialog.watcher = None
+    if enabled:
+        mode = os.environ.get("BREAKDOWN_WATCH") or watcher.WATCH_NATIVE
+        dialog.watcher = watcher.Watcher(mode, parent=dialog)
+        dialog.watcher.changed.connect(
+            lambda directories: _directories_changed(dialog, directories))
+        _update_watched(dialog)
+
+
+def _update_watched(dialog: interface.Dialog):
+    # New versions appear in asset directories, new frames in directories of the last versions.
+    if dialog.watcher is None:
+        return
+    directories = set()
+    for row in dialog.rows:
+        directories.add(row.get_asset())
+        if row.versions:
+            directories.add(os.path.dirname(row.get_path(row.versions[-1])))
+    # Changes made after directories were listed are noticed by the first poll.
+    dialog.watcher.set_directories(
+        {directory: VERSION_INDEX.get_mtime(directory) for directory in directories})
+
+
+def _directories_changed(dialog: interface.Dialog, directories: list):
+    # Running scan may have listed the directories before they changed and native watcher
+    # reports them only once, so they are replayed when it is finished.
+    if dialog.scan is not None or dialog.watched_refresh is not None:
+        dialog.changed_directories.update(directories)
+        return
+    assets = {row.get_asset() for row in dialog.rows}
+    changed = {asset for asset in assets for directory in directories
+               if directory == asset or directory.startswith(asset + "/")}
+    if changed:
+        refresh_rows_async(dialog, [row for row in dialog.rows if row.get_asset() in changed])
+
+
+def _replay_changes(dialog: interface.Dialog):
+    if dialog.changed_directories:
+        directories, dialog.changed_directories = sorted(dialog.changed_directories), set()
+        _directories_changed(dialog, directories)
+
+
+def refresh_rows_async(dialog: interface.Dialog, rows: Iterable["Row"]):
+    """Recompute given rows with listings read in background, the UI is neither blocked nor locked.
+
+    Workers only read listings of the rows into the version index, the rows themselves are
+    recomputed from it on the main thread at once, so actions of the table stay available.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
+        rows (Iterable[Row]): rows to recompute
+    """
+    rows = list(rows)
+    registry = templates.get_templates()
+    VERSION_INDEX.refresh()
+    # Detached rows read the same listings, rows of the dialog are never touched by workers.
+    scan = worker.Scan([row.record for row in rows],
+                       lambda record: engine.Row(record, registry, VERSION_INDEX), dialog)
+    dialog.watched_refresh = scan
+    scan.failed.connect(print)
+    scan.finished.connect(lambda: _refresh_finished(dialog, scan, rows))
+    scan.start()
+
+
+def _refresh_finished(dialog: interface.Dialog, scan: worker.Scan, rows: list):
+    if dialog.watched_refresh is not scan:
+        return
+    dialog.watched_refresh = None
+    scan.deleteLater()
+    current = set(dialog.rows)
+    # Listings were read in this generation of the index, only changed ones since are listed.
+    refresh_rows(dialog, [row for row in rows if row in current], revalidate=False)
+    _replay_changes(dialog)
+
+
+def show_stats(dialog: interface.Dialog, enabled: bool):
+    """Enable profiler and show stats of the next runs in the footer of the dialog.
+
+    Args:
+        dialog (interface.Dialog): Dialog to show stats in
+        enabled (bool): enable or disable profiler
+    """
+    profiling.PROFILER.enabled = enabled
+    dialog.set_stats("Stats of the next run will be shown here." if enabled else "")
+
+
+def _show_run_stats(dialog: interface.Dialog):
+    if profiling.PROFILER.enabled:
+        dialog.set_stats(profiling.PROFILER.summary())
+
+
+def _scan_failed(message: str):
+    print(message)
+    hou.ui.displayMessage("Scene could not be scanned!", details=message,
+                          title="Sorry!", severity=hou.severityType.Error)
+
+
+def refresh_rows(dialog: interface.Dialog, rows: Iterable["Row"], revalidate: bool = True):
+    """Recompute only given rows and patch their cells in place without reparsing the scene.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
+        rows (Iterable[Row]): rows to recompute
+        revalidate (bool): check mtimes of listed directories again, False when listings
+            of the rows were just read by refresh_rows_async
+    """
+    rows = list(rows)
+    with profiling.PROFILER.run("refresh rows"):
+        if revalidate:
+            VERSION_INDEX.refresh()
+        for row in rows:
+            row.refresh(VERSION_INDEX)
+        with profiling.PROFILER.phase("table"):
+            _update_items(dialog, rows)
+        VERSION_INDEX.save()
+        _update_watched(dialog)
+    _show_run_stats(dialog)
+
+
+def _update_items(dialog: interface.Dialog, rows: list):
+    if not dialog.group_by_asset.isChecked():
+        dialog.table.update_rows(rows)
+        return
+    groups = [dialog.groups.get(row.get_asset()) for row in rows]
+    if all(group is not None and row in group.rows for row, group in zip(rows, groups)):
+        dialog.table.update_rows(list(dict.fromkeys(groups)))
+    else:
+        # Some rows moved to another asset.
+        show_rows(dialog)
+
+
+def refresh_assets(dialog: interface.Dialog, assets: Iterable[str]):
+    """Recompute all rows pointing to given assets, for example after deletion of their files.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
+        assets (Iterable[str]): assets to recompute, see Row.get_asset
+    """
+    assets = set(assets)
+    refresh_rows(dialog, [row for row in dialog.rows if row.get_asset() in assets])
 
 
 def update_all(dialog: interface.Dialog):
@@ -35,10 +321,30 @@ def update_all(dialog: interface.Dialog):
     Args:
         dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
     """
-    for row in dialog.table.rows:
-        if row.versions:
-            row.update_version(row.versions[-1], update=False)
-    update_items(dialog)
+    with profiling.PROFILER.run("update all"):
+        set_paths(engine.Engine.plan_update_all(dialog.rows), "Breakdown: Update All")
+        refresh_rows(dialog, dialog.rows)
+    _show_run_stats(dialog)
+
+
+def set_paths(changes: list, label: str) -> bool:
+    """Set new expanded paths to parms of rows in one transaction, see houdini.set_paths.
+
+    Args:
+        changes (list): tuples of (Row, new expanded path)
+        label (str): name of the undo group
+    Returns:
+        True if all paths were set, False if nothing was changed because of an error.
+    """
+    with profiling.PROFILER.phase("set paths"):
+        try:
+            houdini.set_paths([(row.get_parm(), path) for row, path in changes], label=label)
+        except hou.Error as error:
+            hou.ui.displayMessage("Paths could not be set, nothing was changed!",
+                                  details=str(error), title="Sorry!",
+                                  severity=hou.severityType.Error)
+            return False
+    return True
 
 
 def delete_elder(dialog: interface.Dialog):
@@ -47,15 +353,12 @@ def delete_elder(dialog: interface.Dialog):
     Args:
         dialog (interface.Dialog): parent Dialog of BreakdownTable to get values from
     """
-    to_save_set = set()
-    to_delete_set = set()
-    for row in dialog.table.rows:
-        to_save, to_delete = row.get_elders()
-        to_delete_set.update(to_delete)
-        to_save_set.add(to_save)
-    to_delete_set -= to_save_set
-    delete(to_delete_set)
-    update_items(dialog)
+    with profiling.PROFILER.run("delete elder"):
+        plan = engine.Engine.plan_elders(dialog.rows)
+        delete(plan.paths, dry_run=dialog.dry_run.isChecked(),
+               quarantine=dialog.quarantine.isChecked())
+        refresh_assets(dialog, plan.assets)
+    _show_run_stats(dialog)
 
 
 def delete_unused(dialog: interface.Dialog):
@@ -64,44 +367,216 @@ def delete_unused(dialog: interface.Dialog):
     Args:
         dialog (interface.Dialog): parent Dialog of BreakdownTable to get values from
     """
-    to_save_set = set()
-    to_delete_set = set()
-    for row in dialog.table.rows:
-        to_save, to_delete = row.get_unused()
-        to_delete_set.update(to_delete)
-        to_save_set.add(to_save)
-    to_delete_set -= to_save_set
-    delete(to_delete_set)
-    update_items(dialog)
+    with profiling.PROFILER.run("delete unused"):
+        plan = engine.Engine.plan_unused(dialog.rows)
+        delete(plan.paths, dry_run=dialog.dry_run.isChecked(),
+               quarantine=dialog.quarantine.isChecked())
+        refresh_assets(dialog, plan.assets)
+    _show_run_stats(dialog)
+
+
+def apply_retention(dialog: interface.Dialog):
+    """Delete files with versions kept by no rule of the retention policy of the show.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to get values from
+    """
+    with profiling.PROFILER.run("apply retention"):
+        plan = engine.Engine.plan_policy(dialog.rows, retention.get_policy())
+        delete(plan.paths, dry_run=dialog.dry_run.isChecked(),
+               quarantine=dialog.quarantine.isChecked())
+        refresh_assets(dialog, plan.assets)
+    _show_run_stats(dialog)
 
 
-def delete(to_delete: Iterable[str]):
+def delete(to_delete: Iterable[str], dry_run: bool = False, quarantine: bool = False):
     """Delete files with after checking of their existance.
 
     Args:
         to_delete Iterable[str]: List of paths to delete
+        dry_run (bool): Only report what would be deleted and how much space it would free.
+        quarantine (bool): Move files to trash of their volume instead, see files.trash.
     """
-    message = "These files are going to be deleted:\n"
-    to_delete_exists = []
-    for file in to_delete:
-        if os.path.isfile(file):
-            to_delete_exists.append(file)
-            message += f"{file}\n"
-    if not to_delete_exists:
+    plan = disk.plan_deletion(to_delete)
+    if not plan.files:
         hou.ui.displayMessage("Nothing to delete!")
         return
-    if not hou.ui.displayConfirmation(message):
+    summary = f"{len(plan)} files ({disk.format_size(plan.total_bytes)})"
+    details = "\n".join(plan.files)
+    if dry_run:
+        hou.ui.displayMessage(f"Dry run: {summary} would be deleted.",
+                              details=details, title="Dry run")
         return
-    for path in to_delete_exists:
-        print(f"Deleting {path}...")
-        try:
-            os.remove(path)
-        except PermissionError:
-            hou.ui.displayMessage(f"Cannot delete file {path}!\nIt might be:\n"
-                                  f"Houdini doesn't let it go -> restart Houdini\n"
-                                  f"It is opened somewhere else -> close it\n"
-                                  f"You don't have permissions to do it -> contact IT dep.",
-                                  title="Sorry!", severity=hou.severityType.Error)
+    if quarantine:
+        message = f"{summary} are going to be moved to trash for {trash.GRACE_DAYS:g} days."
+    else:
+        message = f"{summary} are going to be deleted."
+    if not hou.ui.displayConfirmation(message, details=details):
+        return
+    with hou.InterruptableOperation("Deleting files", open_interrupt_dialog=True) as operation:
+
+        def progress(done: int, total: int) -> bool:
+            try:
+                operation.updateProgress(done / total)
+            except hou.OperationInterrupted:
+                return False
+            return True
+
+        if quarantine:
+            report, batches = trash.quarantine(plan, progress=progress)
+        else:
+            report = disk.delete_files(plan, progress=progress)
+    # Cancelled run reports only part of the plan, files not reached yet are kept.
+    count = f"{len(report.deleted)} of {len(plan)}" if report.cancelled else len(report.deleted)
+    if quarantine:
+        if batches:
+            _QUARANTINED.append(batches)
+            # Old batches on the same volumes are purged while the artist keeps working.
+            trash.purge_async({os.path.dirname(batch.directory) for batch in batches})
+        result = f"Moved {count} files to trash ({disk.format_size(report.freed_bytes)})."
+    else:
+        result = f"Deleted {count} files, freed {disk.format_size(report.freed_bytes)}."
+    print(result)
+    if report.cancelled:
+        hou.ui.displayMessage(f"Deletion was cancelled!\n{result}", title="Cancelled")
+    if report.failed:
+        details = "\n".join(f"{path}: {error}" for path, error in report.failed.items())
+        hou.ui.displayMessage(f"Cannot delete {len(report.failed)} files!\nIt might be:\n"
+                              f"Houdini doesn't let it go -> restart Houdini\n"
+                              f"It is opened somewhere else -> close it\n"
+                              f"You don't have permissions to do it -> contact IT dep.",
+                              details=details, title="Sorry!", severity=hou.severityType.Error)
+
+
+def export_manifest(path: Optional[str] = None) -> str:
+    """Write file parms of the current scene for project-wide deletion, see breakdown.project.
+
+    Args:
+        path (Optional[str]): file to write, next to the .hip file if not set
+    Returns:
+        Path of the written manifest.
+    """
+    scene = hou.hipFile.path()
+    if path is None:
+        path = os.path.splitext(scene)[0] + project.MANIFEST_SUFFIX
+    records = [get_record(parm) for parm in houdini.get_parms()]
+    project.write_manifest(path, scene, templates.get_templates(), records)
+    return path
+
+
+def export_results(path: Optional[str] = None) -> str:
+    """Scan file parms of the current scene and stream rows to JSON Lines, see breakdown.results.
+
+    Args:
+        path (Optional[str]): file to write, next to the .hip file if not set
+    Returns:
+        Path of the written file.
+    """
+    scene = hou.hipFile.path()
+    if path is None:
+        path = os.path.splitext(scene)[0] + results.RESULTS_SUFFIX
+    # Parms are harvested at once, rows are built and released one by one.
+    records = (get_record(parm) for parm in houdini.get_parms())
+    breakdown = engine.Engine(templates.get_templates(), VERSION_INDEX)
+    results.write_results(path, breakdown.iter_rows(records, keep=False))
+    return path
+
+
+def undo_delete(dialog: interface.Dialog):
+    """Restore files of the last quarantine of the session and refresh the table.
+
+    Args:
+        dialog (interface.Dialog): parent Dialog of BreakdownTable to set values in
+    """
+    if not _QUARANTINED:
+        hou.ui.displayMessage("Nothing to undo!")
+        return
+    restored = []
+    failed = {}
+    for batch in _QUARANTINED.pop():
+        batch_restored, batch_failed = trash.restore(batch)
+        restored.extend(batch_restored)
+        failed.update(batch_failed)
+    print(f"Restored {len(restored)} entries from trash.")
+    refresh_rows(dialog, dialog.rows)
+    if failed:
+        details = "\n".join(f"{path}: {error}" for path, error in failed.items())
+        hou.ui.displayMessage(f"Cannot restore {len(failed)} entries!", details=details,
+                              title="Sorry!", severity=hou.severityType.Error)
+
+
+def get_record(parm: houdini.PathParm) -> engine.Record:
+    """Convert parm to the record understandable by engine module.
+
+    Args:
+        parm (houdini.PathParm): parm to convert
+    Returns:
+        engine.Record with cached values of the parm.
+    """
+    return engine.Record(parm.get_full_parm_name(), parm.get_raw_path(), parm.get_expanded_path())
+
+
+def get_name(title: str, status: int) -> str:
+    """Render name of the asset for the table.
+
+    Args:
+        title (str): name of the asset, see engine.Row.get_title
+        status (int): engine.STATUS_BROKEN, engine.STATUS_OUTDATED or engine.STATUS_UP_TO_DATE
+    Returns:
+        Name of the asset with status marks.
+    """
+    name = title
+    if status == engine.STATUS_BROKEN:
+        # FIXME: color changing does not work.
+        #        We need to be able to show user that path is broken (red) and
+        #        what assets could be updated (yellow)
+        #        Workaround with symbols is done.
+        name = f"❌{name}❌"
+    elif status == engine.STATUS_OUTDATED:
+        name = f"⏱{name}⏱"
+    return name
+
+
+def show_dialog(started: Optional[float] = None) -> interface.Dialog:
+    """Show the resident dialog, it is created and filled by the first call only.
+
+    Reopened dialog shows the table of the previous scan right away and rescans the scene
+    after it is shown, rows are replaced when the scan is finished.
+
+    Args:
+        started (Optional[float]): time.perf_counter() of the click, now if not set
+    Returns:
+        The resident interface.Dialog.
+    """
+    global _DIALOG  # pylint: disable=global-statement
+    started = time.perf_counter() if started is None else started
+    cold = _DIALOG is None
+    if cold:
+        _DIALOG = get_prepared_dialog()
+    reopened = not cold and not _DIALOG.isVisible()
+    _DIALOG.show()
+    _DIALOG.raise_()
+    _DIALOG.activateWindow()
+    name = "open[cold]" if cold else "open[warm]"
+    elapsed = time.perf_counter() - started
+    if reopened:
+        # Harvest of the scene blocks Houdini, so it starts only when the dialog is painted.
+        QtCore.QTimer.singleShot(0, lambda: _revalidate(_DIALOG, name, started, elapsed))
+    else:
+        _add_open_phase(name, started, elapsed)
+    return _DIALOG
+
+
+def _revalidate(dialog: interface.Dialog, name: str, started: float, elapsed: float):
+    set_watching(dialog, dialog.watch.isChecked())
+    update_items(dialog, keep_rows=True)
+    _add_open_phase(name, started, elapsed)
+
+
+def _add_open_phase(name: str, started: float, elapsed: float):
+    # Reported with the phases of the scan started by the dialog, so added after its reset.
+    if profiling.PROFILER.enabled:
+        profiling.PROFILER.add(name, elapsed, started)
 
 
 def get_prepared_dialog() -> interface.Dialog:
@@ -116,77 +591,84 @@ def get_prepared_dialog() -> interface.Dialog:
     dialog.update_all.clicked.connect(lambda x: update_all(dialog))
     dialog.delete_elder.clicked.connect(lambda x: delete_elder(dialog))
     dialog.delete_unused.clicked.connect(lambda x: delete_unused(dialog))
+    dialog.apply_retention.clicked.connect(lambda x: apply_retention(dialog))
+    dialog.undo_delete.clicked.connect(lambda x: undo_delete(dialog))
+    dialog.quarantine.setChecked(os.environ.get("BREAKDOWN_QUARANTINE") != "0")
+    dialog.apply_retention.setToolTip(str(retention.get_policy()))
+    dialog.rescan.clicked.connect(lambda x: update_items(dialog))
+    dialog.cancel.clicked.connect(lambda x: cancel_scan(dialog))
+    dialog.finished.connect(lambda x: cancel_scan(dialog))
+    dialog.finished.connect(lambda x: set_watching(dialog, False))
+    dialog.watch.setChecked(bool(os.environ.get("BREAKDOWN_WATCH")))
+    set_watching(dialog, dialog.watch.isChecked())
+    dialog.watch.toggled.connect(lambda checked: set_watching(dialog, checked))
+    dialog.group_by_asset.toggled.connect(lambda checked: show_rows(dialog))
+    for label, statuses in STATUS_FILTERS:
+        dialog.status_filter.addItem(label, statuses)
+    dialog.status_filter.currentIndexChanged.connect(
+        lambda index: dialog.table.set_status_filter(STATUS_FILTERS[index][1]))
+    dialog.stats_enabled.setChecked(profiling.PROFILER.enabled)
+    dialog.stats_enabled.toggled.connect(lambda checked: show_stats(dialog, checked))
+    dialog.table.version_changed.connect(lambda row, version: row.update_version(version))
+    dialog.table.update_clicked.connect(lambda row: row.update_to_last())
+    dialog.table.delete_elder_clicked.connect(lambda row: row.delete_elder())
+    dialog.table.delete_unused_clicked.connect(lambda row: row.delete_unused())
     update_items(dialog)
     return dialog
 
 
-class Row:
+class Row(engine.Row):
     """Class that connects houdini asset with interface and logic."""
 
     def __init__(
             self,
             dialog: "interface.Dialog",
             parm: houdini.PathParm,
-            template: wrappers.TemplateWrapper):
-        super().__init__()
+            template: Union[wrappers.TemplateWrapper, wrappers.TemplateRegistry],
+            index: disk.VersionIndex,
+            assets: Optional[engine.Assets] = None):
         self._dialog = dialog
         self._parm = parm
-        self._template = template
-        full_path = self._parm.get_expanded_path()
-        self._fields = self._template.parse(full_path)
-        self.version = int(self._fields["version"])
-
-        full_path = self._parm.get_expanded_path()
-        pattern = re.sub(r"v\d+", "v" + "[0-9]" * 3, full_path)
-        versions = []
-        for version in glob.glob(pattern):
-            version = version.replace("\\", "/")
-            versions.append(int(self._template.parse(version)["version"]))
-        self.versions = sorted(versions)
-
-    def to_widgets(self) -> list:
-        """Render class to strings and widgets understandable by interface module.
+        super().__init__(get_record(parm), template, index, assets)
+
+    def refresh(self, index: disk.VersionIndex):
+        """Recompute fields and versions from cached parm value and the version index.
+
+        Args:
+            index (disk.VersionIndex): index to read versions of the asset from
+        Returns:
+
+        """
+        self.record = get_record(self._parm)
+        super().refresh(index)
+
+    def to_values(self) -> list:
+        """Render class to values understandable by interface module.
 
         Args:
 
         Returns:
-            List of str and QtWidgets for method interface.BreakdownTable.update_items
+            List of [name, parm path, version, versions range, size, reclaimable size, status]
+            for interface.BreakdownModel
         """
-        name = f'{self._fields["step"]}: {self._fields["asset"]}'
-        version = int(self._fields["version"])
-        version_widget = QtWidgets.QSpinBox()
-        version_widget.setValue(version)
-        version_widget.valueChanged.connect(self.update_version)
+        name = get_name(self.get_title(), self.status)
         path = self._parm.get_full_parm_name()
         version_range = self.get_version_range()
-        update = interface.UpdateButton()
-        update.clicked.connect(
-            lambda x: self.update_version(self.versions[-1]) if self.versions else None)
-        delete_elder_btn = interface.DeleteButton()
-        delete_elder_btn.clicked.connect(lambda x: self.delete_elder())
-        delete_unused_btn = interface.DeleteButton()
-        delete_unused_btn.clicked.connect(lambda x: self.delete_unused())
-        broken = not os.path.isfile(self._parm.get_expanded_path())
-        outdated = not self.versions or self.versions[-1] != self.version
-        if broken:
-            # FIXME: color changing does not work.
-            #        We need to be able to show user that path is broken (red) and
-            #        what assets could be updated (yellow)
-            #        Workaround with symbols is done.
-            name = f"❌{name}❌"
-        elif outdated:
-            name = f"⏱{name}⏱"
         result = [
             name,
             path,
-            version_widget,
+            self.version,
             version_range,
-            update,
-            delete_elder_btn,
-            delete_unused_btn
+            self.get_size(),
+            self.get_reclaimable(),
+            self.status
         ]
         return result
 
+    def get_parm(self) -> houdini.PathParm:
+        """Get parm of the row."""
+        return self._parm
+
     def update_version(self, new_version: int, update: bool = True):
         """Update item's version to last known.
 
@@ -196,22 +678,35 @@ class Row:
         Returns:
 
         """
-        self._fields["version"] = new_version
-        new_path = self._template.format(self._fields)
+        self.set_path(self.get_path(new_version), update=update)
+
+    def set_path(self, new_path: str, update: bool = True):
+        """Set new expanded path to the parm.
+
+        Args:
+            new_path (str): New expanded path of the asset.
+            update (bool): Update the interface after setting new path.
+        Returns:
+
+        """
+        asset = self.get_asset()
         self._parm.set_path(new_path)
         if update:
-            update_items(self._dialog)
+            # Reclaimable size of every row of the asset depends on versions used by this one.
+            refresh_assets(self._dialog, [asset])
+            if self.get_asset() != asset:
+                refresh_assets(self._dialog, [self.get_asset()])
 
-    def get_version_range(self) -> str:
-        """Just getter method that converts list[int] field to str.
+    def update_to_last(self, update: bool = True):
+        """Update item's version to the last one found on disk.
 
         Args:
-
+            update (bool): Update the interface after setting new version.
         Returns:
-            String with all versions that exist for the asset.
+
         """
-        # TODO: create more beautiful and compact formatting for versions, such as 1-6, 8, 10-12
-        return str(self.versions)[1:-1]
+        if self.versions:
+            self.update_version(self.versions[-1], update=update)
 
     def delete_elder(self, update: bool = True):
         """For all assets: delete files with versions elder than used in scene.
@@ -221,10 +716,13 @@ class Row:
         Returns:
 
         """
-        to_delete = self.get_elders()[1]
-        delete(to_delete)
-        if update:
-            update_items(self._dialog)
+        with profiling.PROFILER.run("delete elder"):
+            to_delete = self.get_elders()[1]
+            delete(to_delete, dry_run=self._dialog.dry_run.isChecked(),
+                   quarantine=self._dialog.quarantine.isChecked())
+            if update:
+                refresh_assets(self._dialog, [self.get_asset()])
+        _show_run_stats(self._dialog)
 
     def delete_unused(self, update: bool = True):
         """For all assets: delete files with versions not used in scene.
@@ -234,41 +732,105 @@ class Row:
         Returns:
 
         """
-        to_delete = self.get_unused()[1]
-        delete(to_delete)
-        if update:
-            update_items(self._dialog)
+        with profiling.PROFILER.run("delete unused"):
+            to_delete = self.get_unused()[1]
+            delete(to_delete, dry_run=self._dialog.dry_run.isChecked(),
+                   quarantine=self._dialog.quarantine.isChecked())
+            if update:
+                refresh_assets(self._dialog, [self.get_asset()])
+        _show_run_stats(self._dialog)
+
+
+class AssetRow:
+    """Rows of one asset collapsed into one line of the table, actions apply to all of them."""
+
+    def __init__(self, dialog: "interface.Dialog"):
+        self._dialog = dialog
+        # Dict is used as ordered set.
+        self.rows = {}
+
+    def to_values(self) -> list:
+        """Render class to values understandable by interface module.
+
+        Args:
+
+        Returns:
+            List of [name, number of parms, last used version, versions range, size,
+            reclaimable size, the worst status of the rows]
+        """
+        rows = list(self.rows)
+        status = min(row.status for row in rows)
+        versions = sorted(set().union(*(row.versions for row in rows)))
+        # Parms using the same file share its versions, so they are counted once.
+        variants = {row.variant: row for row in rows}.values()
+        result = [
+            get_name(rows[0].get_title(), status),
+            f"{len(rows)} parms",
+            max((row.version for row in rows if row.version is not None), default=None),
+            engine.format_versions(versions),
+            sum(row.get_size() for row in variants),
+            sum(row.get_reclaimable() for row in variants),
+            status
+        ]
+        return result
 
-    def get_elders(self) -> (str, list[str]):
-        """Get elder versions of the asset than used by this parm.
+    def update_version(self, new_version: int, update: bool = True):
+        """Set the same version to all rows of the asset.
 
         Args:
+            new_version (int): New version to set for the asset.
+            update (bool): Update the interface after setting new version.
+        Returns:
+
+        """
+        # Unmanaged files in the asset directory have no versions to set.
+        set_paths([(row, row.get_path(new_version)) for row in self.rows if row.is_managed()],
+                  "Breakdown: set version")
+        if update:
+            refresh_rows(self._dialog, self.rows)
+
+    def update_to_last(self, update: bool = True):
+        """Update all rows of the asset to the last version found on disk.
 
+        Args:
+            update (bool): Update the interface after setting new version.
         Returns:
-            Tuple of (current_version_path, [paths_to_elder_versions])
+
         """
-        fields = self._fields.copy()
-        to_delete = []
-        for version in self.versions:
-            if version < self.version:
-                fields["version"] = version
-                path = self._template.format(fields)
-                to_delete.append(path)
-        return self._parm.get_expanded_path(), to_delete
-
-    def get_unused(self) -> (str, list[str]):
-        """Get not used by this parm versions of the asset.
+        set_paths([(row, row.get_path(row.versions[-1])) for row in self.rows
+                   if row.is_managed() and row.versions],
+                  "Breakdown: update to last")
+        if update:
+            refresh_rows(self._dialog, self.rows)
+
+    def delete_elder(self, update: bool = True):
+        """Delete files with versions elder than used by any row of the asset.
 
         Args:
+            update (bool): Update the interface after deletion.
+        Returns:
+
+        """
+        with profiling.PROFILER.run("delete elder"):
+            plan = engine.Engine.plan_elders(self.rows)
+            delete(plan.paths, dry_run=self._dialog.dry_run.isChecked(),
+                   quarantine=self._dialog.quarantine.isChecked())
+            if update:
+                refresh_assets(self._dialog, plan.assets)
+        _show_run_stats(self._dialog)
 
+    def delete_unused(self, update: bool = True):
+        """Delete files with versions not used by any row of the asset.
+
+        Args:
+            update (bool): Update the interface after deletion.
         Returns:
-            Tuple of (current_version_path, [paths_to_unused_versions])
+
         """
-        fields = self._fields.copy()
-        to_delete = []
-        for version in self.versions:
-            if version != self.version:
-                fields["version"] = version
-                path = self._template.format(fields)
-                to_delete.append(path)
-        return self._parm.get_expanded_path(), to_delete
+        with profiling.PROFILER.run("delete unused"):
+            plan = engine.Engine.plan_unused(self.rows)
+            delete(plan.paths, dry_run=self._dialog.dry_run.isChecked(),
+                   quarantine=self._dialog.quarantine.isChecked())
+            if update:
+                refresh_assets(self._dialog, plan.assets)
+        _show_run_stats(self._dialog)
@@ -0,0 +1,202 @@
+"""Wall time and call counts of the Breakdown phases.
+
+Disabled by default, so instrumented code pays only for one attribute check.
+Enable with $BREAKDOWN_PROFILE=1 or the Stats checkbox of the dialog.
+Set $BREAKDOWN_TRACE to a file path to also write Chrome trace JSON of every run
+(open it in chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+
+class _Phase:
+    """Context manager measuring one call of the phase."""
+
+    __slots__ = ("_profiler", "_name", "_start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self._profiler = profiler
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self._profiler.add(self._name, time.perf_counter() - self._start, self._start)
+        return False
+
+
+class Profiler:
+    """Thread safe collector of phases of one run.
+
+    Run is one user action such as a rescan or a deletion, it starts with reset()
+    and ends with finish(). Phases running in threads are summed up, so they may take
+    longer than the run itself.
+    """
+
+    def __init__(self, enabled: bool = False, trace_path: Optional[str] = None):
+        self.enabled = enabled or bool(trace_path)
+        self.trace_path = trace_path
+        self._lock = threading.Lock()
+        self._phases = {}
+        self._events = []
+        self._origin = time.perf_counter()
+        self._running = False
+
+    def reset(self):
+        """Forget everything measured by the previous run."""
+        with self._lock:
+            self._phases = {}
+            self._events = []
+            self._origin = time.perf_counter()
+
+    def phase(self, name: str):
+        """Measure the block of code as the phase.
+
+        Args:
+            name (str): name of the phase
+        Returns:
+            Context manager, it does nothing when profiler is disabled.
+        """
+        if not self.enabled:
+            return _NULL
+        return _Phase(self, name)
+
+    def add(self, name: str, seconds: float, start: Optional[float] = None):
+        """Add one call of the phase measured elsewhere.
+
+        Args:
+            name (str): name of the phase
+            seconds (float): wall time of the call
+            start (Optional[float]): time.perf_counter() at the start of the call, for the trace
+        Returns:
+
+        """
+        with self._lock:
+            phase = self._phases.setdefault(name, [0, 0.0])
+            phase[0] += 1
+            phase[1] += seconds
+            if self.trace_path and start is not None:
+                self._events.append({
+                    "name": name,
+                    "ph": "X",
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": seconds * 1e6,
+                })
+
+    def finish(self, name: str) -> str:
+        """Measure the whole run since reset() as the phase and report it.
+
+        Args:
+            name (str): name of the run
+        Returns:
+            Summary of the run, empty if profiler is disabled.
+        """
+        if not self.enabled:
+            return ""
+        self.add(name, time.perf_counter() - self._origin, self._origin)
+        return self.report()
+
+    @contextlib.contextmanager
+    def run(self, name: str):
+        """Measure the block as one run: reset, time and report it.
+
+        Runs started inside of another run are measured as its phases.
+
+        Args:
+            name (str): name of the run
+        Returns:
+            Context manager.
+        """
+        if not self.enabled or self._running:
+            with self.phase(name):
+                yield
+            return
+        self.reset()
+        self._running = True
+        try:
+            yield
+        finally:
+            self._running = False
+            self.finish(name)
+
+    def get_phases(self) -> dict:
+        """Get measured phases.
+
+        Args:
+
+        Returns:
+            Dict of name: (calls, seconds). Phases running in threads are summed up.
+        """
+        with self._lock:
+            return {name: tuple(value) for name, value in self._phases.items()}
+
+    def summary(self) -> str:
+        """Render phases to one line, the slowest first."""
+        phases = sorted(self.get_phases().items(), key=lambda item: -item[1][1])
+        return " | ".join(f"{name} {seconds:.3f}s ({calls})" for name, (calls, seconds) in phases)
+
+    def write_trace(self, path: Optional[str] = None):
+        """Write Chrome trace JSON of the run.
+
+        Args:
+            path (Optional[str]): file to write, trace_path if not set
+        Returns:
+
+        """
+        path = path or self.trace_path
+        with self._lock:
+            data = {"traceEvents": list(self._events),
+                    "phases": {name: {"calls": calls, "seconds": seconds}
+                               for name, (calls, seconds) in self._phases.items()}}
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+
+    def report(self) -> str:
+        """Print summary of the run and write the trace if it is enabled.
+
+        Args:
+
+        Returns:
+            Summary of the run, empty if profiler is disabled.
+        """
+        if not self.enabled:
+            return ""
+        summary = self.summary()
+        print(f"Breakdown stats: {summary}")
+        if self.trace_path:
+            self.write_trace()
+        return summary
+
+
+def profiled(name: str) -> Callable:
+    """Decorator measuring every call of the function as the phase.
+
+    Args:
+        name (str): name of the phase
+    Returns:
+        Decorator.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+            with _Phase(PROFILER, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_NULL = contextlib.nullcontext()
+PROFILER = Profiler(bool(os.environ.get("BREAKDOWN_PROFILE")), os.environ.get("BREAKDOWN_TRACE"))
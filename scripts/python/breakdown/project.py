@@ -0,0 +1,325 @@
+"""Project-wide deletion plans across many scenes.
+
+Every scene exports a manifest of its file parms (see logic.export_manifest),
+versions used by any of the manifests are counted together, so a version shared by
+several scenes is kept until the last of them stops using it.
+Manifests are read and asset directories are scanned in a process pool,
+it needs neither hou nor PySide2.
+
+Usage from scripts/python (with lucidity on PYTHONPATH):
+    python -m breakdown.project /show/manifests --mode unused
+    python -m breakdown.project /show/manifests --mode elder --delete
+"""
+
+import argparse
+import concurrent.futures
+import functools
+import json
+import os
+import sys
+from typing import Iterable, NamedTuple, Optional
+
+from breakdown import engine
+from breakdown import profiling
+from breakdown import retention
+from config import wrappers
+from files import disk
+
+MANIFEST_SUFFIX = ".breakdown.json"
+# Increase when the manifest format changes.
+MANIFEST_VERSION = 2
+PLANS = {
+    "unused": engine.Engine.plan_unused,
+    "elder": engine.Engine.plan_elders,
+    "retention": lambda rows: engine.Engine.plan_policy(rows, retention.get_policy()),
+}
+
+
+class Use(NamedTuple):
+    """Version of the asset used by one parm of one scene."""
+    key: str
+    variant: str
+    version: int
+    template: tuple
+    record: engine.Record
+
+
+class Manifest(NamedTuple):
+    """Versions used by one scene."""
+    scene: str
+    uses: list
+    unmanaged: list
+
+
+def write_manifest(path: str, scene: str, registry: wrappers.TemplateRegistry,
+                   records: Iterable[engine.Record]):
+    """Write file parms of the scene for project-wide planning.
+
+    Args:
+        path (str): file to write, see MANIFEST_SUFFIX
+        scene (str): path of the .hip file
+        registry (wrappers.TemplateRegistry): templates the records are matched with
+        records (Iterable[engine.Record]): file parms of the scene
+    Returns:
+
+    """
+    data = {
+        "version": MANIFEST_VERSION,
+        "scene": scene,
+        "templates": [{"name": template.name, "pattern": template.pattern}
+                      for template in registry.templates],
+        "records": [list(record) for record in records],
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=1)
+
+
+def load_manifest(path: str) -> (str, wrappers.TemplateRegistry, list[engine.Record]):
+    """Read manifest written by write_manifest.
+
+    Args:
+        path (str): manifest to read
+    Returns:
+        Tuple of (scene, templates of the scene, [records]).
+    Raises:
+        ValueError: manifest is not readable.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported version {data.get('version')!r}")
+        registry = _get_registry(tuple((item["name"], item["pattern"])
+                                       for item in data["templates"]))
+        records = [engine.Record(*record) for record in data["records"]]
+        return data["scene"], registry, records
+    except (OSError, KeyError, TypeError, ValueError) as error:
+        raise ValueError(f"Manifest {path} cannot be read: {error}") from error
+
+
+def read_manifest(path: str) -> Manifest:
+    """Read manifest and find asset and version used by every record. Runs in a worker process.
+
+    Args:
+        path (str): manifest written by write_manifest
+    Returns:
+        Manifest, records not matching the template are returned as unmanaged.
+    Raises:
+        ValueError: manifest is not readable, it must not be skipped silently
+            because versions used by the scene would not be protected.
+    """
+    scene, registry, records = load_manifest(path)
+    uses = []
+    unmanaged = []
+    for record in records:
+        template = registry.match(record.expanded_path)
+        if template is None:
+            unmanaged.append(record)
+            continue
+        fields = template.parse(record.expanded_path)
+        key = template.get_version_folders(fields)[0]
+        # Scenes saved at different frames share the variant of a sequence.
+        frame = engine.find_frame(record.raw_path, record.expanded_path)
+        variant = engine.get_variant(template, fields, frame)
+        # Parm path is prefixed with the scene, so every scene counts as its own reference.
+        uses.append(Use(key, variant, int(fields["version"]), (template.name, template.pattern),
+                        record._replace(parm_path=f"{scene}:{record.parm_path}")))
+    return Manifest(scene, uses, unmanaged)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_template(name: str, pattern: str) -> wrappers.TemplateWrapper:
+    # Cached per worker process, so the compiled pattern is shared by all its manifests.
+    return wrappers.TemplateWrapper(name, pattern)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_registry(templates: tuple) -> wrappers.TemplateRegistry:
+    return wrappers.TemplateRegistry(_get_template(name, pattern) for name, pattern in templates)
+
+
+class Usage:
+    """Reference counted versions used by all scenes, grouped by asset.
+
+    Scene added again replaces its previous references, so a re-exported manifest
+    can be merged into an existing usage.
+    """
+
+    def __init__(self):
+        # key: {(variant, version): {record: None}}, dict is used as ordered set.
+        self._assets = {}
+        self._templates = {}
+        self._scenes = {}
+
+    def add_scene(self, manifest: Manifest):
+        """Add references of every record of the scene.
+
+        Args:
+            manifest (Manifest): versions used by the scene
+        Returns:
+
+        """
+        self.remove_scene(manifest.scene)
+        self._scenes[manifest.scene] = manifest.uses
+        for use in manifest.uses:
+            references = self._assets.setdefault(use.key, {})
+            references.setdefault((use.variant, use.version), {})[use.record] = None
+            self._templates.setdefault(use.key, use.template)
+
+    def remove_scene(self, scene: str):
+        """Remove references of the scene, versions used only by it become unused.
+
+        Args:
+            scene (str): path of the .hip file
+        Returns:
+
+        """
+        for use in self._scenes.pop(scene, []):
+            references = self._assets[use.key]
+            records = references[(use.variant, use.version)]
+            records.pop(use.record, None)
+            if not records:
+                del references[(use.variant, use.version)]
+            if not references:
+                del self._assets[use.key]
+                del self._templates[use.key]
+
+    @property
+    def scenes(self) -> list[str]:
+        """Scenes added to the usage."""
+        return list(self._scenes)
+
+    @property
+    def assets(self) -> list[str]:
+        """Keys of assets used by any scene, see engine.Row.get_asset."""
+        return list(self._assets)
+
+    def get_in_use(self, key: str) -> dict:
+        """Get versions of the asset used by any scene.
+
+        Args:
+            key (str): key of the asset
+        Returns:
+            Dict of (variant, version): number of parms using it in all scenes.
+        """
+        return {use: len(records) for use, records in self._assets.get(key, {}).items()}
+
+    def get_task(self, key: str) -> tuple:
+        """Get everything a worker process needs to plan deletion of the asset.
+
+        Args:
+            key (str): key of the asset
+        Returns:
+            Tuple of (template name, template pattern, [one record per used version]).
+        """
+        records = [next(iter(records)) for records in self._assets[key].values()]
+        return self._templates[key] + (records,)
+
+
+def collect_usage(paths: Iterable[str], workers: Optional[int] = None) -> Usage:
+    """Read manifests in a process pool and count versions they use.
+
+    Args:
+        paths (Iterable[str]): manifests, see find_manifests
+        workers (Optional[int]): number of processes, number of CPUs if not set
+    Returns:
+        Usage of all scenes.
+    """
+    usage = Usage()
+    with profiling.PROFILER.phase("read manifests"):
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            for manifest in pool.map(read_manifest, paths, chunksize=8):
+                if manifest.unmanaged:
+                    print(f"{manifest.scene}: {len(manifest.unmanaged)} parms do not match "
+                          f"the template, their files are not protected.")
+                usage.add_scene(manifest)
+    return usage
+
+
+def plan(usage: Usage, mode: str = "unused", workers: Optional[int] = None) -> engine.DeletePlan:
+    """Plan deletion across all scenes, versions used by any scene are kept.
+
+    Every asset is scanned once in a worker process with the same rules
+    as engine.Engine.plan_unused or engine.Engine.plan_elders use for one scene.
+
+    Args:
+        usage (Usage): versions used by all scenes
+        mode (str): "unused", "elder" or "retention", see PLANS
+        workers (Optional[int]): number of processes, number of CPUs if not set
+    Returns:
+        engine.DeletePlan of all assets.
+    """
+    if mode not in PLANS:
+        raise ValueError(f"Unknown plan mode {mode!r}.")
+    tasks = [usage.get_task(key) + (mode,) for key in usage.assets]
+    paths = set()
+    assets = set()
+    with profiling.PROFILER.phase("plan assets"):
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            for result in pool.map(_plan_asset, tasks, chunksize=16):
+                paths.update(result.paths)
+                assets.update(result.assets)
+    return engine.DeletePlan(paths, assets)
+
+
+def _plan_asset(task: tuple) -> engine.DeletePlan:
+    # Runs in a worker process, directories are listed fresh to not trust stale listings.
+    name, pattern, records, mode = task
+    rows = engine.Engine(_get_template(name, pattern)).build_rows(records)
+    return PLANS[mode](rows)
+
+
+def find_manifests(paths: Iterable[str]) -> list[str]:
+    """Expand directories to manifests inside of them.
+
+    Args:
+        paths (Iterable[str]): manifests or directories to search recursively
+    Returns:
+        Sorted paths of manifests.
+    """
+    manifests = set()
+    for path in paths:
+        if not os.path.isdir(path):
+            manifests.add(path)
+            continue
+        for directory, _, files in os.walk(path):
+            manifests.update(os.path.join(directory, name)
+                             for name in files if name.endswith(MANIFEST_SUFFIX))
+    return sorted(manifests)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Starting point of the project-wide deletion."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("manifests", nargs="+", help="manifests or directories with them")
+    parser.add_argument("--mode", choices=sorted(PLANS), default="unused")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--delete", action="store_true",
+                        help="delete planned files, only report them if not set")
+    args = parser.parse_args(argv)
+
+    profiling.PROFILER.reset()
+    try:
+        usage = collect_usage(find_manifests(args.manifests), args.workers)
+    except ValueError as error:
+        print(error)
+        return 1
+    delete_plan = plan(usage, args.mode, args.workers)
+    files = disk.plan_deletion(delete_plan.paths)
+    print(f"{len(usage.scenes)} scenes use {len(usage.assets)} assets, "
+          f"{len(delete_plan.assets)} of them have {args.mode} versions: "
+          f"{len(files)} files ({disk.format_size(files.total_bytes)}).")
+    report = disk.delete_files(files, dry_run=not args.delete)
+    for path in report.deleted:
+        print(path)
+    for path, error in report.failed.items():
+        print(f"{path}: {error}")
+    if args.delete:
+        print(f"Deleted {len(report.deleted)} files, "
+              f"freed {disk.format_size(report.freed_bytes)}.")
+    profiling.PROFILER.finish("project")
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Streaming export and import of scan results as JSON Lines, one row per line.
+
+Lines are written while rows are built and read back one by one, so downstream tools
+can consume results incrementally. Exported rows are released once their line is written,
+memory of the export grows only with listings of asset directories, which are cached.
+Rows are rebuilt from their records by engine, it needs neither hou nor PySide2.
+Reclaimable size depends on all parms of the asset, so only sizes of every version
+are exported and consumers sum what they need.
+
+Usage from scripts/python (with lucidity on PYTHONPATH):
+    python -m breakdown.results export /show/scene.breakdown.json --output scene.jsonl
+    python -m breakdown.results summary scene.jsonl
+"""
+
+import argparse
+import collections
+import contextlib
+import json
+import sys
+from typing import ContextManager, Iterable, Iterator, NamedTuple, Optional, TextIO
+
+from breakdown import engine
+from breakdown import project
+
+RESULTS_SUFFIX = ".breakdown.jsonl"
+_STATUSES = {name: status for status, name in engine.STATUS_NAMES.items()}
+
+
+class Result(NamedTuple):
+    """Scan result of one parm read from a line."""
+    parm_path: str
+    raw_path: str
+    expanded_path: str
+    template: Optional[str]
+    fields: dict
+    version: Optional[int]
+    versions: list
+    status: int
+    sizes: dict
+
+    @property
+    def record(self) -> engine.Record:
+        """Record the row of the result is rebuilt from, see engine.Engine.iter_rows."""
+        return engine.Record(self.parm_path, self.raw_path, self.expanded_path)
+
+
+def to_dict(row: engine.Row) -> dict:
+    """Convert row to values of one line.
+
+    Args:
+        row (engine.Row): row to convert
+    Returns:
+        Dict with JSON compatible values, keys of sizes are versions as str.
+    """
+    return {
+        "parm": row.record.parm_path,
+        "raw_path": row.record.raw_path,
+        "expanded_path": row.record.expanded_path,
+        "template": row.template.name if row.template is not None else None,
+        "fields": row.get_fields(),
+        "version": row.version,
+        "versions": row.versions,
+        "status": engine.STATUS_NAMES[row.status],
+        "sizes": {str(version): size for version, size in row.sizes.items()},
+    }
+
+
+def iter_lines(rows: Iterable[engine.Row]) -> Iterator[str]:
+    """Convert rows to lines one by one.
+
+    Args:
+        rows (Iterable[engine.Row]): rows, any iterator is consumed lazily
+    Returns:
+        Iterator of JSON lines ending with a new line.
+    """
+    for row in rows:
+        yield json.dumps(to_dict(row), ensure_ascii=False) + "\n"
+
+
+def write_results(path: str, rows: Iterable[engine.Row]) -> int:
+    """Write rows to a JSON Lines file as they come.
+
+    Args:
+        path (str): file to write, "-" for stdout
+        rows (Iterable[engine.Row]): rows, for example engine.Engine.iter_rows
+    Returns:
+        Number of written rows.
+    """
+    count = 0
+    with _open(path, "w") as file:
+        for line in iter_lines(rows):
+            file.write(line)
+            count += 1
+    return count
+
+
+def parse_line(line: str) -> Result:
+    """Convert one line written by iter_lines back to values.
+
+    Args:
+        line (str): JSON line
+    Returns:
+        Result of the line.
+    Raises:
+        ValueError: line is not a result.
+    """
+    try:
+        data = json.loads(line)
+        return Result(
+            data["parm"], data["raw_path"], data["expanded_path"], data["template"],
+            data["fields"], data["version"], data["versions"], _STATUSES[data["status"]],
+            {int(version): size for version, size in data["sizes"].items()})
+    except (KeyError, TypeError, AttributeError, ValueError) as error:
+        raise ValueError(f"not a scan result: {error}") from error
+
+
+def read_results(path: str) -> Iterator[Result]:
+    """Read results line by line, empty lines are skipped.
+
+    Args:
+        path (str): file written by write_results, "-" for stdin
+    Returns:
+        Iterator of results in order they were written.
+    Raises:
+        ValueError: line is not a result, path and line number are in the message.
+    """
+    with _open(path, "r") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                yield parse_line(line)
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: {error}") from error
+
+
+def _open(path: str, mode: str) -> ContextManager[TextIO]:
+    # Standard streams are used for "-" and stay open.
+    if path == "-":
+        return contextlib.nullcontext(sys.stdout if mode == "w" else sys.stdin)
+    return open(path, mode, encoding="utf-8")
+
+
+def read_rows(path: str, breakdown: engine.Engine) -> Iterator[engine.Row]:
+    """Rebuild rows of exported results with versions found on disk now.
+
+    Args:
+        path (str): file written by write_results, "-" for stdin
+        breakdown (engine.Engine): engine with templates of the show
+    Returns:
+        Iterator of rows in order they were written.
+    """
+    return breakdown.iter_rows(result.record for result in read_results(path))
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Starting point of the headless export."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="scan records of a scene manifest")
+    export_parser.add_argument("manifest", help="manifest, see logic.export_manifest")
+    export_parser.add_argument("--output", default="-", help="file to write, stdout if not set")
+    summary_parser = commands.add_parser("summary", help="count rows of results by status")
+    summary_parser.add_argument("results", nargs="+", help="files of results, - for stdin")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "export":
+            _, registry, records = project.load_manifest(args.manifest)
+            rows = engine.Engine(registry).iter_rows(records, keep=False)
+            count = write_results(args.output, rows)
+            print(f"Exported {count} rows.", file=sys.stderr)
+            return 0
+        statuses = collections.Counter()
+        for path in args.results:
+            for result in read_results(path):
+                statuses[engine.STATUS_NAMES[result.status]] += 1
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+    print(", ".join(f"{count} {status}" for status, count in sorted(statuses.items())) + ".")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
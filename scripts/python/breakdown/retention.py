@@ -0,0 +1,174 @@
+"""Retention policies: which versions of every asset are kept by a cleanup.
+
+Policy is read from $BREAKDOWN_RETENTION or config/retention.json, for example:
+    {"keep_last": 3, "newer_than_days": 14, "keep_previous": true, "keep_tagged": true}
+Versions used by the scene are always kept, a version is tagged to be kept forever
+by a TAG_FILE in its directory.
+"""
+
+import bisect
+import functools
+import json
+import os
+import time
+from typing import Iterable, NamedTuple, Optional
+
+# Empty file marking the version directory as kept by every policy with keep_tagged.
+TAG_FILE = ".keep"
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "retention.json")
+_NANOSECONDS_PER_DAY = 86400 * 10 ** 9
+
+
+class VersionSet:
+    """Sorted versions of one variant of the asset with their mtimes and tags.
+
+    Versions are also kept sorted by mtime, so every rule of the policy is a slice
+    found by bisection instead of a loop over versions.
+    """
+
+    __slots__ = ("versions", "tagged", "_by_time")
+
+    def __init__(self, versions: Iterable[int], times: Optional[dict] = None,
+                 tagged: Iterable[int] = ()):
+        self.versions = sorted(versions)
+        self.tagged = frozenset(tagged)
+        times = times or {}
+        self._by_time = sorted(
+            (times[version], version) for version in self.versions if times.get(version))
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def __str__(self) -> str:
+        return ", ".join(str(first) if first == last else f"{first}-{last}"
+                         for first, last in self.get_ranges())
+
+    def get_last(self, count: int) -> list[int]:
+        """Get the last versions.
+
+        Args:
+            count (int): number of versions
+        Returns:
+            Up to count highest versions.
+        """
+        return self.versions[-count:] if count > 0 else []
+
+    def get_newer(self, mtime: int) -> list[int]:
+        """Get versions written since the time.
+
+        Args:
+            mtime (int): st_mtime_ns
+        Returns:
+            Versions with mtime not elder than given, versions of unknown mtime are not included.
+        """
+        start = bisect.bisect_left(self._by_time, (mtime,))
+        return [version for _, version in self._by_time[start:]]
+
+    def get_previous(self, version: int) -> Optional[int]:
+        """Get the highest version lower than given one.
+
+        Args:
+            version (int): any version, it does not need to exist
+        Returns:
+            Previous version, None if there is no one.
+        """
+        position = bisect.bisect_left(self.versions, version)
+        return self.versions[position - 1] if position else None
+
+    def get_ranges(self) -> list[tuple[int, int]]:
+        """Collapse consecutive versions.
+
+        Args:
+
+        Returns:
+            List of (first, last) of every run of consecutive versions.
+        """
+        ranges = []
+        for version in self.versions:
+            if ranges and ranges[-1][1] + 1 == version:
+                ranges[-1] = (ranges[-1][0], version)
+            else:
+                ranges.append((version, version))
+        return ranges
+
+
+class Policy(NamedTuple):
+    """Rules of versions to keep, a version kept by any rule is not deleted."""
+    keep_last: int = 0
+    newer_than_days: Optional[float] = None
+    keep_previous: bool = False
+    keep_tagged: bool = True
+
+    def select(self, versions: VersionSet, used: set[int], now: Optional[float] = None
+               ) -> list[int]:
+        """Select versions to delete.
+
+        Args:
+            versions (VersionSet): versions found on disk
+            used (set[int]): versions used by the scene, they are always kept
+            now (Optional[float]): time.time() to count days from, now if not set
+        Returns:
+            Sorted versions kept by no rule.
+        """
+        keep = set(used)
+        keep.update(versions.get_last(self.keep_last))
+        if self.newer_than_days is not None:
+            now = time.time() if now is None else now
+            keep.update(versions.get_newer(
+                int(now * 10 ** 9 - self.newer_than_days * _NANOSECONDS_PER_DAY)))
+        if self.keep_previous:
+            keep.update(versions.get_previous(version) for version in used)
+        if self.keep_tagged:
+            keep.update(versions.tagged)
+        return [version for version in versions.versions if version not in keep]
+
+    def __str__(self) -> str:
+        rules = ["used"]
+        if self.keep_last:
+            rules.append(f"last {self.keep_last}")
+        if self.newer_than_days is not None:
+            rules.append(f"newer than {self.newer_than_days:g} days")
+        if self.keep_previous:
+            rules.append("previous")
+        if self.keep_tagged:
+            rules.append(f"tagged with {TAG_FILE}")
+        return "keep " + ", ".join(rules)
+
+
+def get_policy() -> Policy:
+    """Get policy of the show from $BREAKDOWN_RETENTION or config/retention.json.
+
+    Policy is reused until the file changes.
+
+    Args:
+
+    Returns:
+        Policy, the default one keeping only used and tagged versions if there is no file
+        or it is not valid.
+    """
+    path = os.environ.get("BREAKDOWN_RETENTION") or DEFAULT_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return Policy()
+    return _load_policy(path, mtime)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_policy(path: str, _mtime: int) -> Policy:
+    try:
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError) as error:
+        print(f"Retention policy {path} is not used: {error}")
+        return Policy()
+    if not isinstance(data, dict):
+        print(f"Retention policy {path} is not used: it is not a JSON object.")
+        return Policy()
+    unknown = sorted(set(data).difference(Policy._fields))
+    if unknown:
+        print(f"Retention policy {path} is not used: unknown keys {', '.join(unknown)}, "
+              f"known are {', '.join(Policy._fields)}.")
+        return Policy()
+    return Policy(**data)
@@ -0,0 +1,125 @@
+"""Watching of asset directories, so the table follows caches written by the farm."""
+
+import concurrent.futures
+import os
+
+from PySide2 import QtCore
+
+# Modes of Watcher.
+WATCH_NATIVE = "native"
+WATCH_POLL = "poll"
+
+
+class Watcher(QtCore.QObject):
+    """Reports changed directories in debounced batches.
+
+    Native mode uses QFileSystemWatcher (inotify on Linux), which does not see changes made
+    by other machines on network storage. Poll mode compares mtimes of directories
+    in a background thread instead.
+    """
+
+    changed = QtCore.Signal(list)
+    _polled = QtCore.Signal(list)
+    _found = QtCore.Signal(list)
+
+    def __init__(self, mode: str = WATCH_NATIVE, interval: int = 2000, debounce: int = 500,
+                 parent=None):
+        super().__init__(parent)
+        if mode not in (WATCH_NATIVE, WATCH_POLL):
+            raise ValueError(f"Unknown watch mode {mode!r}.")
+        self.mode = mode
+        self._directories = {}
+        self._pending = set()
+        self._debounce = QtCore.QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce)
+        self._debounce.timeout.connect(self._flush)
+        self._native = None
+        self._poll_timer = None
+        self._polling = None
+        # File system is touched only in this thread, slow storage does not block the UI.
+        self._pool = concurrent.futures.ThreadPoolExecutor(1)
+        if mode == WATCH_NATIVE:
+            self._native = QtCore.QFileSystemWatcher(self)
+            self._native.directoryChanged.connect(self._add_changes)
+            self._found.connect(self._on_found)
+        else:
+            self._polled.connect(self._on_polled)
+            self._poll_timer = QtCore.QTimer(self)
+            self._poll_timer.setInterval(interval)
+            self._poll_timer.timeout.connect(self._poll)
+            self._poll_timer.start()
+
+    def set_directories(self, directories: dict):
+        """Watch only given directories, missing ones are skipped.
+
+        Args:
+            directories (dict): path: st_mtime_ns the directory had when it was read,
+                None if unknown. Poll mode reports directories with different mtime
+        Returns:
+
+        """
+        directories = {directory.replace("\\", "/"): mtime
+                       for directory, mtime in directories.items()}
+        if self._native is not None:
+            removed = set(self._native.directories()).difference(directories)
+            if removed:
+                self._native.removePaths(list(removed))
+            added = set(directories).difference(self._native.directories())
+            if added:
+                self._pool.submit(self._find, sorted(added))
+        self._directories = directories
+
+    def stop(self):
+        """Stop watching, no more signals will be emitted."""
+        self.set_directories({})
+        self._debounce.stop()
+        if self._poll_timer is not None:
+            self._poll_timer.stop()
+        self._pool.shutdown(wait=False)
+
+    def _add_changes(self, directory: str):
+        self._pending.add(directory)
+        self._debounce.start()
+
+    def _flush(self):
+        if self._pending:
+            changed, self._pending = sorted(self._pending), set()
+            self.changed.emit(changed)
+
+    def _find(self, directories: list):
+        self._found.emit([directory for directory in directories if os.path.isdir(directory)])
+
+    def _on_found(self, directories: list):
+        # Directories might be unwatched while they were checked.
+        added = [directory for directory in directories if directory in self._directories
+                 and directory not in self._native.directories()]
+        if added:
+            self._native.addPaths(added)
+
+    def _poll(self):
+        # Previous poll is still waiting for slow storage.
+        if self._polling is not None and not self._polling.done():
+            return
+        self._polling = self._pool.submit(self._stat, dict(self._directories))
+
+    def _stat(self, directories: dict):
+        changed = []
+        mtimes = {}
+        for directory, known in directories.items():
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            mtimes[directory] = mtime
+            if known is not None and mtime != known:
+                changed.append(directory)
+        self._polled.emit([mtimes, changed])
+
+    def _on_polled(self, result: list):
+        mtimes, changed = result
+        for directory, mtime in mtimes.items():
+            if directory in self._directories:
+                self._directories[directory] = mtime
+        for directory in changed:
+            self._add_changes(directory)
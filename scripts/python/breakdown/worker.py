@@ -0,0 +1,111 @@
+"""Background scanning of the scene data, so Houdini UI stays responsive."""
+
+import concurrent.futures
+import threading
+import traceback
+from typing import Callable
+
+from PySide2 import QtCore
+
+
+class ScanWorker(QtCore.QObject):
+    """Builds rows from items on a thread pool and streams them in batches.
+
+    Items must be already read from the scene on the main thread,
+    build callable is expected to touch only file system and pure python code.
+    """
+
+    rows_ready = QtCore.Signal(list)
+    progress = QtCore.Signal(int, int)
+    failed = QtCore.Signal(str)
+    finished = QtCore.Signal()
+
+    def __init__(self, items: list, build: Callable, workers: int = 8, batch: int = 100):
+        super().__init__()
+        self._items = items
+        self._build = build
+        self._workers = workers
+        self._batch = batch
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """Ask the worker to stop, rows which are already built are still delivered."""
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        """Check if cancel was requested."""
+        return self._cancelled.is_set()
+
+    def run(self):
+        """Build all rows keeping the order of items. Runs in the worker thread.
+
+        Args:
+
+        Returns:
+
+        """
+        total = len(self._items)
+        self.progress.emit(0, total)
+        batch = []
+        # Rows are built in parallel since most of the time is spent waiting for file system.
+        with concurrent.futures.ThreadPoolExecutor(self._workers) as pool:
+            futures = [pool.submit(self._build, item) for item in self._items]
+            for done, future in enumerate(futures, 1):
+                if self._cancelled.is_set():
+                    break
+                try:
+                    batch.append(future.result())
+                except Exception:  # pylint: disable=broad-exception-caught
+                    self._cancelled.set()
+                    self.failed.emit(traceback.format_exc())
+                    break
+                if len(batch) >= self._batch or done == total:
+                    self.rows_ready.emit(batch)
+                    self.progress.emit(done, total)
+                    batch = []
+            if self._cancelled.is_set():
+                for future in futures:
+                    future.cancel()
+        if batch:
+            self.rows_ready.emit(batch)
+        self.finished.emit()
+
+
+class Scan(QtCore.QObject):
+    """Owner of ScanWorker and its QThread.
+
+    Signals of the worker are re-emitted by the Scan in the thread it lives in (main thread),
+    so it is safe to connect plain python callables touching the interface to them.
+    """
+
+    rows_ready = QtCore.Signal(list)
+    progress = QtCore.Signal(int, int)
+    failed = QtCore.Signal(str)
+    finished = QtCore.Signal()
+
+    def __init__(self, items: list, build: Callable, parent=None):
+        super().__init__(parent)
+        self.worker = ScanWorker(items, build)
+        self._thread = QtCore.QThread(self)
+        self.worker.moveToThread(self._thread)
+        self._thread.started.connect(self.worker.run)
+        self.worker.rows_ready.connect(self.rows_ready)
+        self.worker.progress.connect(self.progress)
+        self.worker.failed.connect(self.failed)
+        self.worker.finished.connect(self._thread.quit)
+        # Finished is re-emitted once the thread has stopped, so the Scan can be deleted at once.
+        self._thread.finished.connect(self.finished)
+
+    def start(self):
+        """Start scanning in the background thread."""
+        self._thread.start()
+
+    def cancel(self):
+        """Stop scanning and wait until the thread is finished."""
+        self.worker.cancel()
+        self._thread.quit()
+        self._thread.wait()
+
+    def is_running(self) -> bool:
+        """Check if the scan is still in progress."""
+        return self._thread.isRunning()
@@ -0,0 +1,23 @@
+"""List of known file parms by node type.
+
+Used to harvest file parms by walking node type instances instead of hou.fileReferences().
+Keys are (node type category name, node type name), values are names of file parms.
+"""
+
+FILE_PARMS = {
+    ("Sop", "file"): ("file",),
+    ("Sop", "alembic"): ("fileName",),
+    ("Sop", "filecache"): ("file",),
+    ("Sop", "filecache::2.0"): ("file",),
+    ("Sop", "rop_geometry"): ("sopoutput",),
+    ("Sop", "rop_alembic"): ("filename",),
+    ("Sop", "usdimport"): ("filepath1",),
+    ("Sop", "attribfrommap"): ("filename",),
+    ("Sop", "tableimport"): ("filename",),
+    ("Object", "alembicarchive"): ("fileName",),
+    ("Driver", "geometry"): ("sopoutput",),
+    ("Driver", "alembic"): ("filename",),
+    ("Dop", "filecache"): ("file",),
+    ("Lop", "sublayer"): ("filepath1",),
+    ("Lop", "reference::2.0"): ("filepath1",),
+}
@@ -1,8 +1,15 @@
 """List of project templates."""
 
+import functools
+import json
+import os
+
 from config import roots
 from config import wrappers
 
+# Templates of the show tried in order, $JOB in patterns is replaced by the expanded $JOB.
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), "templates.json")
+
 
 def get_generic_template() -> wrappers.TemplateWrapper:
     """Get the generic template based on existing assignment structure.
@@ -14,5 +21,41 @@ def get_generic_template() -> wrappers.TemplateWrapper:
     """
     root = roots.get_job_root()
     pattern = root + "/{step}/{asset}/v{version}/{asset_basename}"
-    generic_template = wrappers.TemplateWrapper("general", pattern)
+    generic_template = get_template("general", pattern)
     return generic_template
+
+
+@functools.lru_cache(maxsize=None)
+def get_template(name: str, pattern: str) -> wrappers.TemplateWrapper:
+    """Get TemplateWrapper reused between scans, so its compiled pattern and parse cache stay warm.
+
+    Args:
+        name (str): name of the template
+        pattern (str): pattern of the template
+    Returns:
+        TemplateWrapper with pattern set.
+    """
+    return wrappers.TemplateWrapper(name, pattern)
+
+
+def get_templates() -> wrappers.TemplateRegistry:
+    """Get registry of all templates of the show from $BREAKDOWN_TEMPLATES or templates.json.
+
+    Registry is reused until the file or $JOB changes.
+
+    Args:
+
+    Returns:
+        TemplateRegistry with templates in order of the file.
+    """
+    path = os.environ.get("BREAKDOWN_TEMPLATES") or DEFAULT_PATH
+    return _load_templates(path, os.stat(path).st_mtime_ns, roots.get_job_root())
+
+
+@functools.lru_cache(maxsize=4)
+def _load_templates(path: str, _mtime: int, root: str) -> wrappers.TemplateRegistry:
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    return wrappers.TemplateRegistry(
+        get_template(item["name"], item["pattern"].replace("$JOB", root))
+        for item in data["templates"])
@@ -1,8 +1,72 @@
 """Wrappers that introduces more control of 3rd party classes."""
 
+import copy
+import functools
+import re
+from typing import Iterable, Optional
+
 import lucidity
 
 
+class CompiledTemplate:
+    """Fast path for lucidity.Template with the same results.
+
+    lucidity rebuilds its regular expression and format specification on every call,
+    here they are built once: a single anchored regex for parsing and a plan of
+    literals and placeholders for formatting.
+    """
+
+    # pylint: disable=protected-access
+    def __init__(self, template: lucidity.Template):
+        self.template = template
+        # Regex is built by lucidity itself, so parsing rules stay exactly the same.
+        expanded = template.expanded_pattern()
+        self.regex = template._construct_regular_expression(expanded)
+        self._groups = []
+        for group in sorted(self.regex.groupindex):
+            # Strip number that lucidity adds to make group name unique.
+            self._groups.append((group, group[:-3].split(template._period_code)))
+        self.nested = any(len(parts) > 1 for _, parts in self._groups)
+        specification = template._construct_format_specification(expanded)
+        self._plan = []
+        pieces = template._PLAIN_PLACEHOLDER_REGEX.split(specification)
+        for i, piece in enumerate(pieces):
+            if i % 2:
+                self._plan.append((piece, piece.split(".")))
+            elif piece:
+                self._plan.append((piece, None))
+
+    def parse(self, path: str) -> dict:
+        """Same as lucidity.Template.parse in RELAXED mode."""
+        match = self.regex.search(path)
+        if not match:
+            raise lucidity.ParseError(f"Path {path!r} did not match template pattern.")
+        data = {}
+        for group, parts in self._groups:
+            target = data
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = match.group(group)
+        return data
+
+    def format(self, data: dict) -> str:
+        """Same as lucidity.Template.format."""
+        result = []
+        for piece, parts in self._plan:
+            if parts is None:
+                result.append(piece)
+                continue
+            try:
+                value = data
+                for part in parts:
+                    value = value[part]
+            except (TypeError, KeyError) as error:
+                raise lucidity.FormatError(
+                    f"Could not format data {data!r} due to missing key {piece!r}.") from error
+            result.append(value)
+        return "".join(result)
+
+
 class TemplateWrapper:
     """Template class for creating paths.
     FIXME: Case sensitive politics should be applied depending on used File System.
@@ -10,13 +74,34 @@ class TemplateWrapper:
            In this version we think that every field was already checked and 100% correct.
     """
 
-    def __init__(self, name: str, path: str):
+    def __init__(self, name: str, path: str, cache_size: int = 65536):
         path = path.replace("\\", "/")
+        self.name = name
+        self.pattern = path
         self._template = lucidity.Template(name, path)
         fields = self._template.keys()
         # FIXME: existance of version field is now hardcoded
         if "version" not in fields:
             raise ValueError("Template must contain 'version' field.")
+        self._compiled = CompiledTemplate(self._template)
+        self._parse_cached = functools.lru_cache(maxsize=cache_size)(self._parse_or_none)
+        segments = path.split("/")
+        depth = next(i for i, segment in enumerate(segments) if "{version" in segment)
+        self._root = CompiledTemplate(
+            lucidity.Template(f"{name}_root", "/".join(segments[:depth])))
+        self._folder = segments[depth]
+
+    def _parse_or_none(self, path: str) -> Optional[dict]:
+        # lru_cache does not keep raised errors, so misses are cached as None.
+        try:
+            return self._compiled.parse(path)
+        except lucidity.ParseError:
+            return None
+
+    @property
+    def regex(self) -> re.Pattern:
+        """Regex parsing the paths, built by lucidity."""
+        return self._compiled.regex
 
     def format(self, fields: dict) -> str:
         """Apply fields to template to get rendered str.
@@ -28,14 +113,112 @@ class TemplateWrapper:
         """
         if "version" in fields:
             fields["version"] = str(fields["version"]).zfill(3)
-        return self._template.format(fields)
+        return self._compiled.format(fields)
+
+    def format_many(self, fields: Iterable[dict]) -> list[str]:
+        """Apply every fields dict to template, see format.
+
+        Args:
+            fields (Iterable[dict]): dicts of key/value for formatting the pattern
+        Returns:
+            List of pattern strings in the same order.
+        """
+        return [self.format(item) for item in fields]
 
     def parse(self, path: str) -> dict:
         """Extract fields from str with respect to template.
 
+        Results are memoized, every call returns a new dict which is safe to modify.
+
         Args:
             path (str): pattern string with all keys replaces by values.
         Returns:
             Pairs of key/value used for formatting the pattern
+        Raises:
+            lucidity.ParseError: path does not match the template.
         """
-        return self._template.parse(path)
+        fields = self._parse_cached(path)
+        if fields is None:
+            raise lucidity.ParseError(f"Path {path!r} did not match template pattern.")
+        if self._compiled.nested:
+            return copy.deepcopy(fields)
+        return fields.copy()
+
+    def parse_many(self, paths: Iterable[str]) -> list[dict]:
+        """Extract fields from every str with respect to template, see parse.
+
+        Args:
+            paths (Iterable[str]): pattern strings with all keys replaces by values.
+        Returns:
+            List of key/value dicts in the same order.
+        """
+        return [self.parse(path) for path in paths]
+
+    def match(self, path: str) -> Optional["TemplateWrapper"]:
+        """Get the template if it can parse the path, see TemplateRegistry.match.
+
+        Args:
+            path (str): expanded path
+        Returns:
+            The template itself, None if the path does not match it.
+        """
+        return self if self._parse_cached(path) is not None else None
+
+    def get_version_folders(self, fields: dict) -> (str, re.Pattern):
+        """Get directory holding all versions of the asset and regex for its entries.
+
+        Args:
+            fields (dict): pairs of key/value of any version of the asset
+        Returns:
+            Tuple of (expanded directory, regex matching entry names with version as first group)
+        """
+        root = self._root.format(fields)
+        expression = ""
+        for part in re.split(r"({[^}]+})", self._folder):
+            key = part[1:-1].split(":")[0] if part.startswith("{") else None
+            if key == "version":
+                expression += r"(\d{3})"
+            elif key:
+                expression += re.escape(str(fields[key]))
+            else:
+                expression += re.escape(part)
+        return root, re.compile(expression)
+
+
+class TemplateRegistry:
+    """Templates of all path layouts of the show, the first matching one is used for a path.
+
+    Templates are not tried one by one: their regexes are joined into one alternation,
+    so a path is dispatched in a single pass of the regex engine.
+    """
+
+    def __init__(self, templates: Iterable[TemplateWrapper], cache_size: int = 65536):
+        self.templates = list(templates)
+        if not self.templates:
+            raise ValueError("Registry must contain at least one template.")
+        alternatives = []
+        for i, template in enumerate(self.templates):
+            # Group names repeat between templates, only the marker group of each one is kept.
+            expression = _NAMED_GROUP_REGEX.sub("(?:", template.regex.pattern.lstrip("^"))
+            alternatives.append(f"(?:{expression})(?P<_{i}>)")
+        self._regex = re.compile("|".join(alternatives))
+        self._match_cached = functools.lru_cache(maxsize=cache_size)(self._match)
+
+    def _match(self, path: str) -> Optional[TemplateWrapper]:
+        match = self._regex.match(path)
+        if match is None:
+            return None
+        return self.templates[int(match.lastgroup[1:])]
+
+    def match(self, path: str) -> Optional[TemplateWrapper]:
+        """Find template of the path.
+
+        Args:
+            path (str): expanded path
+        Returns:
+            The first template matching the path in order of the registry, None if no one does.
+        """
+        return self._match_cached(path)
+
+
+_NAMED_GROUP_REGEX = re.compile(r"\(\?P<\w+>")
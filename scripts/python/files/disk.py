@@ -0,0 +1,360 @@
+"""Classes and functions for interacting with file system."""
+
+import concurrent.futures
+import os
+import re
+import stat
+import threading
+from typing import Callable, Iterable, Optional
+
+from breakdown import profiling
+from files import store as listing_store
+
+# File system calls are mostly waiting for network storage, so threads are worth it.
+WORKERS = 16
+
+
+class Listing:
+    """Snapshot of one directory made with a single os.scandir call.
+
+    Files are stored as dict of name: size in bytes.
+    """
+
+    def __init__(self, path: str, mtime: Optional[int], files: dict, folders: set):
+        self.path = path
+        self.mtime = mtime
+        self.files = files
+        self.folders = folders
+        self.generation = -1
+
+
+class VersionIndex:
+    """Cache of directory listings shared by all rows of the Breakdown.
+
+    Every directory is listed at most once per refresh. Between refreshes listings are kept
+    and only directories whose mtime changed are listed again.
+    Index is safe to use from several threads, every directory is scanned by one thread only.
+    With a store, listings are also loaded from and saved to it, so a new session only
+    stats directories and lists again the changed ones.
+    FIXME: mtime of a directory changes only when entries are added, removed or renamed.
+           Files rewritten in place are not noticed, which is fine for existence checks.
+    """
+
+    def __init__(self, store: Optional[listing_store.ListingStore] = None):
+        self._listings = {}
+        self._versions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._directory_locks = {}
+        self._store = store
+        self._unsaved = []
+        self._preloaded = set()
+        self._preload_lock = threading.Lock()
+
+    def refresh(self):
+        """Start a new refresh so every directory is revalidated on the next access.
+
+        Args:
+
+        Returns:
+
+        """
+        self._generation += 1
+
+    @property
+    def generation(self) -> int:
+        """Number of the current refresh, results read during one refresh may be cached by it."""
+        return self._generation
+
+    def invalidate(self, directory: Optional[str] = None):
+        """Forget cached listing of the directory or of all directories.
+
+        Args:
+            directory (Optional[str]): directory to forget, None to forget everything
+        Returns:
+
+        """
+        if directory is None:
+            self._listings.clear()
+            self._versions.clear()
+        else:
+            self._listings.pop(directory.replace("\\", "/"), None)
+
+    def listdir(self, directory: str) -> Listing:
+        """Get listing of the directory, rescanning it only if its mtime changed.
+
+        Args:
+            directory (str): path to directory
+        Returns:
+            Listing with names of files and folders. Missing directory gives empty listing.
+        """
+        directory = directory.replace("\\", "/")
+        listing = self._listings.get(directory)
+        if listing is not None and listing.generation == self._generation:
+            return listing
+        with self._lock:
+            directory_lock = self._directory_locks.setdefault(directory, threading.Lock())
+        with directory_lock:
+            listing = self._listings.get(directory)
+            if listing is not None and listing.generation == self._generation:
+                return listing
+            if listing is None and self._store is not None and not self._is_preloaded(directory):
+                listing = self._load(directory)
+            try:
+                with profiling.PROFILER.phase("stat"):
+                    mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if listing is None or listing.mtime != mtime:
+                listing = self._scan(directory, mtime)
+                if self._store is not None:
+                    with self._lock:
+                        self._unsaved.append(listing)
+            self._listings[directory] = listing
+            listing.generation = self._generation
+            return listing
+
+    def preload(self, root: str):
+        """Load listings of all directories under the root from the store at once.
+
+        Loaded listings are still revalidated by mtime on the first access.
+        Every root is loaded only once, directories under it are never loaded one by one.
+
+        Args:
+            root (str): path to directory, for example directory of all versions of an asset
+        Returns:
+
+        """
+        root = root.replace("\\", "/").rstrip("/")
+        if self._store is None or self._is_preloaded(root):
+            return
+        with self._preload_lock:
+            if self._is_preloaded(root):
+                return
+            with profiling.PROFILER.phase("load index"):
+                stored = self._store.load_tree(root)
+            with self._lock:
+                for path, mtime, files, folders in stored:
+                    if path not in self._listings:
+                        self._listings[path] = Listing(path, mtime, files, folders)
+            self._preloaded.add(root)
+
+    def _is_preloaded(self, directory: str) -> bool:
+        while directory not in self._preloaded:
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                return False
+            directory = parent
+        return True
+
+    def save(self):
+        """Write listings scanned since the last save to the store in one transaction.
+
+        Args:
+
+        Returns:
+
+        """
+        if self._store is None:
+            return
+        with self._lock:
+            unsaved, self._unsaved = self._unsaved, []
+        with profiling.PROFILER.phase("save index"):
+            self._store.save((listing.path, listing.mtime, listing.files, listing.folders)
+                             for listing in unsaved)
+
+    def _load(self, directory: str) -> Optional[Listing]:
+        with profiling.PROFILER.phase("load index"):
+            stored = self._store.load(directory)
+        return Listing(directory, *stored) if stored is not None else None
+
+    def get_mtime(self, directory: str) -> Optional[int]:
+        """Get mtime of the directory when it was listed last time, file system is not touched.
+
+        Args:
+            directory (str): path to directory
+        Returns:
+            st_mtime_ns, None if directory was not listed or does not exist.
+        """
+        listing = self._listings.get(directory.replace("\\", "/"))
+        return listing.mtime if listing is not None else None
+
+    def isfile(self, path: str) -> bool:
+        """Check existence of the file using cached listing of its directory.
+
+        Args:
+            path (str): path to file
+        Returns:
+            True if file exists.
+        """
+        directory, name = os.path.split(path.replace("\\", "/"))
+        return name in self.listdir(directory).files
+
+    def getsize(self, path: str) -> Optional[int]:
+        """Get size of the file from cached listing of its directory.
+
+        Args:
+            path (str): path to file
+        Returns:
+            Size in bytes, None if file does not exist.
+        """
+        directory, name = os.path.split(path.replace("\\", "/"))
+        return self.listdir(directory).files.get(name)
+
+    def get_versions(self, root: str, folder: re.Pattern) -> list[int]:
+        """Get versions found in the directory holding all versions of one asset.
+
+        Args:
+            root (str): directory with version folders (or files) of the asset
+            folder (re.Pattern): regex for the entry name with version as the first group
+        Returns:
+            Sorted list of versions found.
+        """
+        listing = self.listdir(root)
+        key = (listing.path, folder.pattern)
+        cached = self._versions.get(key)
+        if cached is not None and cached[0] is listing:
+            return cached[1]
+        versions = set()
+        for name in listing.folders.union(listing.files):
+            match = folder.fullmatch(name)
+            if match:
+                versions.add(int(match.group(1)))
+        versions = sorted(versions)
+        self._versions[key] = (listing, versions)
+        return versions
+
+    @staticmethod
+    def _scan(directory: str, mtime: Optional[int]) -> Listing:
+        files = {}
+        folders = set()
+        if mtime is not None:
+            try:
+                with profiling.PROFILER.phase("scandir"), os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            folders.add(entry.name)
+                        else:
+                            # Stat result is cached by the entry, on Windows it comes with listing.
+                            files[entry.name] = _get_entry_size(entry)
+            except OSError:
+                pass
+        return Listing(directory, mtime, files, folders)
+
+
+def _get_entry_size(entry: os.DirEntry) -> int:
+    try:
+        return entry.stat().st_size
+    except OSError:
+        return 0
+
+
+class DeletionPlan:
+    """Existing files to delete with their sizes."""
+
+    def __init__(self, files: dict):
+        self.files = files
+        self.total_bytes = sum(files.values())
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+
+class DeletionReport:
+    """Result of deletion, all failures are collected instead of stopping on the first one."""
+
+    def __init__(self, dry_run: bool):
+        self.dry_run = dry_run
+        self.deleted = []
+        self.failed = {}
+        self.freed_bytes = 0
+        self.cancelled = False
+
+
+def format_size(size: int) -> str:
+    """Render size in bytes to human readable str.
+
+    Args:
+        size (int): size in bytes
+    Returns:
+        String such as "1.5 GB".
+    """
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if size < 1024 or unit == "TB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+
+@profiling.profiled("stat")
+def _get_file_size(path: str) -> Optional[int]:
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+    return info.st_size if stat.S_ISREG(info.st_mode) else None
+
+
+_remove = profiling.profiled("remove")(os.remove)
+
+
+@profiling.profiled("plan deletion")
+def plan_deletion(paths: Iterable[str], workers: int = WORKERS) -> DeletionPlan:
+    """Check existence and size of files in parallel.
+
+    Args:
+        paths (Iterable[str]): paths to delete, missing files and folders are skipped
+        workers (int): number of threads
+    Returns:
+        DeletionPlan with existing files only.
+    """
+    paths = sorted(set(paths))
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        sizes = pool.map(_get_file_size, paths)
+        files = {path: size for path, size in zip(paths, sizes) if size is not None}
+    return DeletionPlan(files)
+
+
+@profiling.profiled("delete")
+def delete_files(
+        plan: DeletionPlan,
+        dry_run: bool = False,
+        progress: Optional[Callable[[int, int], bool]] = None,
+        workers: int = WORKERS) -> DeletionReport:
+    """Delete files of the plan across a bounded thread pool.
+
+    Args:
+        plan (DeletionPlan): files to delete
+        dry_run (bool): only report what would be deleted
+        progress (Optional[Callable[[int, int], bool]]): called with (done, total) in the calling
+            thread, returning False cancels files which are not deleted yet
+        workers (int): number of threads
+    Returns:
+        DeletionReport with deleted files, failures and freed bytes.
+    """
+    report = DeletionReport(dry_run)
+    total = len(plan)
+    if dry_run:
+        report.deleted = list(plan.files)
+        report.freed_bytes = plan.total_bytes
+        if progress is not None:
+            progress(total, total)
+        return report
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(_remove, path): path for path in plan.files}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            path = futures[future]
+            try:
+                future.result()
+            except concurrent.futures.CancelledError:
+                continue
+            except OSError as error:
+                report.failed[path] = error.strerror or str(error)
+            else:
+                report.deleted.append(path)
+                report.freed_bytes += plan.files[path]
+            if progress is not None and not report.cancelled and not progress(done, total):
+                report.cancelled = True
+                for pending in futures:
+                    pending.cancel()
+    return report
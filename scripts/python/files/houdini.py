@@ -1,19 +1,60 @@
 """Classes and functions for intercting with Houdini API."""
 
+import os
+import time
+from typing import Iterable, Optional
+
 import hou  # pylint: disable=import-error
 
+from breakdown import engine
+from breakdown import profiling
+from config import parms as parms_config
+
+# Harvesting modes of get_parms.
+HARVEST_REFERENCES = "references"
+HARVEST_NODES = "nodes"
+
 
 class PathParm:
-    """Wrapper for hou.Parm."""
+    """Wrapper for hou.Parm.
+
+    Values are read from Houdini once, when the object is created or the path is set.
+    Rarely used values are read lazily.
+    """
+
+    __slots__ = ("_parm", "_path", "_raw_path", "_expanded_path", "_animated", "_reference")
 
     def __init__(self, parm: hou.Parm):
         self._update(parm)
 
+    @classmethod
+    def from_snapshot(cls, parm: hou.Parm, path: str, raw_path: str, expanded_path: str,
+                      animated: bool) -> "PathParm":
+        """Create the object from values which were already read from hou API.
+
+        Args:
+            parm (hou.Parm): source hou.Parm
+            path (str): parm.path()
+            raw_path (str): parm.unexpandedString()
+            expanded_path (str): parm.eval()
+            animated (bool): parm.isTimeDependent()
+        Returns:
+            PathParm without any extra calls to hou API.
+        """
+        self = cls.__new__(cls)
+        self._parm = parm
+        self._path = path
+        self._raw_path = raw_path
+        self._expanded_path = expanded_path
+        self._animated = animated
+        self._reference = None
+        return self
+
     def __hash__(self) -> int:
-        return hash(self._parm.path())
+        return hash(self._path)
 
     def __eq__(self, other: "PathParm"):
-        return self._parm.path() == other._parm.path()
+        return self._path == other._path
 
     def _update(self, parm: hou.Parm):
         """Updates the object with new data from hou API.
@@ -27,8 +68,9 @@ class PathParm:
         self._raw_path = parm.unexpandedString()
         self._expanded_path = parm.eval()
         self._parm = parm
+        self._path = parm.path()
         self._animated = parm.isTimeDependent()
-        self._reference = parm.getReferencedParm() == parm
+        self._reference = None
 
     def is_animated(self) -> bool:
         """Check if parm is animated or scripted."""
@@ -36,11 +78,13 @@ class PathParm:
 
     def is_reference(self) -> bool:
         """Check if parm is only a link to another parm."""
+        if self._reference is None:
+            self._reference = self._parm.getReferencedParm() == self._parm
         return self._reference
 
     def get_full_parm_name(self) -> str:
         """Get full path to parm in format: f"{node}/{parm}."""
-        return self._parm.path()
+        return self._path
 
     def get_raw_path(self) -> str:
         """Get parm value with any expressions and variables."""
@@ -67,57 +111,231 @@ class PathParm:
         Returns:
 
         """
-        # FIXME: using $OS should be discussed with Leads because it can lead to bad scene structure
-        job = hou.expandString("$JOB")
-        hip = hou.expandString("$HIP")
-        os = self._parm.node().name()
-        if with_job:
-            path = path.replace(job, "$JOB")
-        if with_hip:
-            path = path.replace(hip, "$HIP")
-        if with_os:
-            path = path.replace(os, "$OS")
-        self._parm.set(path)
+        variables = get_variables(with_job, with_hip)
+        self._parm.set(self.to_value(path, variables, with_os))
         self._update(self._parm)
 
+    def to_value(self, path: str, variables: dict, with_os: bool = True) -> str:
+        """Convert expanded path to the parm value with variables.
 
-def get_setter_parm(parm: hou.Parm) -> hou.Parm:
+        Args:
+            path (str): expanded path
+            variables (dict): variable: expanded value to swap, see get_variables
+            with_os (bool): to swap $OS value with '$OS' for more flexible use in Houdini
+        Returns:
+            Value to set to hou.Parm.
+        """
+        for variable, value in variables.items():
+            path = path.replace(value, variable)
+        if with_os:
+            # FIXME: using $OS should be discussed with Leads because it can lead to bad scene
+            #        structure
+            path = path.replace(self._parm.node().name(), "$OS")
+        return path
+
+    def read_raw_path(self) -> str:
+        """Read current parm value from hou.Parm instead of the snapshot of get_raw_path."""
+        return self._parm.unexpandedString()
+
+    def set_value(self, value: str):
+        """Set value to hou.Parm and refresh values read from it."""
+        self._parm.set(value)
+        self._raw_path = value
+        self._expanded_path = self._parm.eval()
+
+
+def get_variables(with_job: bool = True, with_hip: bool = True) -> dict:
+    """Expand variables used instead of absolute paths in parm values.
+
+    Args:
+        with_job (bool): include $JOB
+        with_hip (bool): include $HIP
+    Returns:
+        Dict of variable: expanded value, in order they should be swapped.
+    """
+    variables = {}
+    if with_job:
+        variables["$JOB"] = hou.expandString("$JOB")
+    if with_hip:
+        variables["$HIP"] = hou.expandString("$HIP")
+    return variables
+
+
+def set_paths(changes: list, with_job: bool = True, with_hip: bool = True, with_os: bool = True,
+              label: str = "Breakdown: set paths"):
+    """Set paths of many parms as one transaction.
+
+    All values are computed before the scene is touched, variables are expanded once.
+    Parms are set in one undo group with cooking suspended, so the scene cooks once
+    after the last change. If any parm fails, all parms already set get their previous values.
+
+    Args:
+        changes (list): tuples of (PathParm, expanded path to set)
+        with_job (bool): to swap $JOB value with '$JOB' for more flexible use in Houdini
+        with_hip (bool): to swap $HIP value with '$HIP' for more flexible use in Houdini
+        with_os (bool): to swap $OS value with '$OS' for more flexible use in Houdini
+        label (str): name of the undo group
+    Returns:
+
+    Raises:
+        hou.Error: error of the failed parm after previous values are restored.
+    """
+    variables = get_variables(with_job, with_hip)
+    values = [(parm, parm.to_value(path, variables, with_os)) for parm, path in changes]
+    done = []
+    with hou.undos.group(label):
+        update_mode = hou.updateModeSetting()
+        hou.setUpdateMode(hou.updateMode.Manual)
+        try:
+            for parm, value in values:
+                # Snapshot of the harvest is stale if the artist edited the parm since.
+                previous = parm.read_raw_path()
+                parm.set_value(value)
+                done.append((parm, previous))
+        except hou.Error:
+            for parm, previous in reversed(done):
+                parm.set_value(previous)
+            raise
+        finally:
+            hou.setUpdateMode(update_mode)
+
+
+def get_setter_parm(parm: hou.Parm, chains: Optional[dict] = None) -> hou.Parm:
     """Find the "setter" parm from which reference chain starts.
 
     Args:
         parm (hou.Parm): parm to start from
+        chains (Optional[dict]): memo of already resolved parms, shared between calls
+            of one harvest so every parm of every chain is resolved only once
     Returns:
         Last parm in reference chain.
     """
-    while parm != parm.getReferencedParm():
-        parm = parm.getReferencedParm()
-    return parm
+    if chains is None:
+        chains = {}
+    visited = []
+    while parm not in chains:
+        referenced = parm.getReferencedParm()
+        visited.append(parm)
+        if referenced == parm:
+            chains[parm] = parm
+            break
+        parm = referenced
+    setter = chains[parm]
+    for item in visited:
+        chains[item] = setter
+    return setter
 
 
-def get_parms() -> {hou.Parm}:
-    """Referencing parms and expressions will be skipped.
+def get_reference_parms() -> list:
+    """Get parms via hou.fileReferences() with the $OS workaround described in main.py.
 
     Args:
 
     Returns:
-        Set of unique hou.Parms referencing files in Houdini scene.
+        List of hou.Parms referencing files.
     """
-    parms = set()
     # FIXME: remove this workaround once major bug described in main.py fixed
     #        you can comment hscript lines to see the bug
     # FIXME: workaround should be tested on huge scenes and changing to cooking
     #        type "Manual" may be considered since opchange might recook the whole scene
-    hou.hscript("opchange '$OS' '$OS1'")
-    references = hou.fileReferences()
-    hou.hscript("opchange '$OS1' '$OS'")
-    for row in references:
-        parm = PathParm(get_setter_parm(row[0]))
+    with profiling.PROFILER.phase("opchange"):
+        hou.hscript("opchange '$OS' '$OS1'")
+    with profiling.PROFILER.phase("fileReferences"):
+        references = hou.fileReferences()
+    with profiling.PROFILER.phase("opchange"):
+        hou.hscript("opchange '$OS1' '$OS'")
+    return [row[0] for row in references]
+
+
+def get_node_parms(file_parms: Optional[dict] = None) -> list:
+    """Get parms by walking instances of known node types, the scene is not modified.
+
+    Parms with the same unexpanded value (for example with $OS) are all returned,
+    unlike hou.fileReferences(). Node types missing in the index are not harvested.
+
+    Args:
+        file_parms (Optional[dict]): index of file parm names by node type, see config.parms
+    Returns:
+        List of hou.Parms referencing files.
+    """
+    if file_parms is None:
+        file_parms = parms_config.FILE_PARMS
+    categories = hou.nodeTypeCategories()
+    result = []
+    for (category_name, type_name), parm_names in file_parms.items():
+        category = categories.get(category_name)
+        node_type = category.nodeType(type_name) if category is not None else None
+        if node_type is None:
+            continue
+        for node in node_type.instances():
+            for parm_name in parm_names:
+                parm = node.parm(parm_name)
+                if parm is not None:
+                    result.append(parm)
+    return result
+
+
+def get_parms(mode: Optional[str] = None) -> [PathParm]:
+    """Referencing parms and expressions will be skipped.
+
+    Args:
+        mode (Optional[str]): HARVEST_REFERENCES or HARVEST_NODES,
+            $BREAKDOWN_HARVEST or HARVEST_REFERENCES if not set
+    Returns:
+        List of unique PathParms referencing files in Houdini scene, in the harvest order.
+    """
+    if mode is None:
+        mode = os.environ.get("BREAKDOWN_HARVEST", HARVEST_REFERENCES)
+    if mode == HARVEST_NODES:
+        with profiling.PROFILER.phase("node walk"):
+            harvested = get_node_parms()
+    elif mode == HARVEST_REFERENCES:
+        harvested = get_reference_parms()
+    else:
+        raise ValueError(f"Unknown harvest mode {mode!r}.")
+    with profiling.PROFILER.phase("resolve references"):
+        chains = {}
+        # Dict drops duplicated setters and keeps the harvest order.
+        setters = {get_setter_parm(harvested_parm, chains): None for harvested_parm in harvested}
+    with profiling.PROFILER.phase("read parms"):
+        return _read_parms(setters)
+
+
+def _read_parms(setters: Iterable[hou.Parm]) -> [PathParm]:
+    parms = []
+    for setter in setters:
+        # Values are read once and in order of filters, so skipped parms cost less calls.
+        raw_path = setter.unexpandedString()
         # TODO: create rules for parsed parm and node types with external config file
-        folder = parm.get_raw_path() == "$HIP"
-        python = parm.get_raw_path()[-3:] == ".py"
-        json = parm.get_raw_path()[-5:] == ".json"
+        folder = raw_path == "$HIP"
+        python = raw_path[-3:] == ".py"
+        json = raw_path[-5:] == ".json"
         if folder or python or json:
             continue
-        if not parm.is_animated():
-            parms.add(parm)
+        animated = setter.isTimeDependent()
+        # Sequences are time dependent because of the frame variable only, expressions are not.
+        if animated and (not engine.has_frame_variable(raw_path) or "`" in raw_path):
+            continue
+        parms.append(
+            PathParm.from_snapshot(setter, setter.path(), raw_path, setter.eval(), animated))
     return parms
+
+
+def compare_harvest_modes(repeat: int = 3) -> dict:
+    """Time harvesting of the current scene in every mode and print the comparison.
+
+    Args:
+        repeat (int): number of runs per mode, the best one is taken
+    Returns:
+        Dict of mode: (best time in seconds, number of parms found).
+    """
+    result = {}
+    for mode in (HARVEST_REFERENCES, HARVEST_NODES):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parms = get_parms(mode)
+            timings.append(time.perf_counter() - start)
+        result[mode] = (min(timings), len(parms))
+        print(f"{mode}: {min(timings):.3f}s, {len(parms)} parms")
+    return result
@@ -0,0 +1,165 @@
+"""Persistent storage of directory listings shared by Houdini sessions."""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Iterable, Optional
+
+# Increase when the schema changes, old databases are recreated.
+SCHEMA_VERSION = 1
+# Seconds to wait for other sessions writing to the same database.
+TIMEOUT = 10.0
+
+
+def get_default_path() -> Optional[str]:
+    """Get path of the database from $BREAKDOWN_INDEX or the user cache directory.
+
+    FIXME: SQLite locking is not reliable on some network file systems, so a shared
+           database under $JOB should be tested on the studio storage first.
+
+    Args:
+
+    Returns:
+        Path to the database file, None if $BREAKDOWN_INDEX is "off".
+    """
+    path = os.environ.get("BREAKDOWN_INDEX")
+    if path == "off":
+        return None
+    if path:
+        return path
+    if sys.platform == "win32":
+        cache = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        cache = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(cache, "breakdown", "index.sqlite")
+
+
+class ListingStore:
+    """SQLite table of directory listings, safe for concurrent readers and writers.
+
+    Every thread uses its own connection. Database errors never break the Breakdown,
+    the store just stops being used after the first one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._disabled = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=TIMEOUT)
+        # WAL lets other sessions read while one of them writes.
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                connection.execute("DROP TABLE IF EXISTS listings")
+                connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "path TEXT PRIMARY KEY, mtime INTEGER, files TEXT, folders TEXT)")
+        self._local.connection = connection
+        return connection
+
+    def _fail(self, error: Exception):
+        if not self._disabled:
+            print(f"Breakdown index {self.path} is not used: {error}")
+        self._disabled = True
+
+    def load(self, path: str) -> Optional[tuple]:
+        """Get stored listing of the directory.
+
+        Args:
+            path (str): path to directory
+        Returns:
+            Tuple of (mtime, {file: size}, {folder}), None if directory is not stored.
+        """
+        if self._disabled:
+            return None
+        try:
+            row = self._connect().execute(
+                "SELECT mtime, files, folders FROM listings WHERE path = ?", (path,)).fetchone()
+        except (sqlite3.Error, OSError) as error:
+            self._fail(error)
+            return None
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), set(json.loads(row[2]))
+
+    def load_tree(self, root: str) -> list:
+        """Get stored listings of the directory and all directories inside of it in one query.
+
+        Args:
+            root (str): path to directory
+        Returns:
+            List of tuples (path, mtime, {file: size}, {folder}).
+        """
+        if self._disabled:
+            return []
+        root = root.rstrip("/")
+        try:
+            rows = self._connect().execute(
+                "SELECT path, mtime, files, folders FROM listings "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (root, root + "/", root + "0")).fetchall()
+        except (sqlite3.Error, OSError) as error:
+            self._fail(error)
+            return []
+        return [(path, mtime, json.loads(files), set(json.loads(folders)))
+                for path, mtime, files, folders in rows]
+
+    def save(self, listings: Iterable[tuple]):
+        """Store listings in one transaction, newer listings of other sessions are replaced.
+
+        Stored mtime is checked on every load, so a stale listing is only a cache miss.
+
+        Args:
+            listings (Iterable[tuple]): tuples of (path, mtime, {file: size}, {folder})
+        Returns:
+
+        """
+        if self._disabled:
+            return
+        rows = [(path, mtime, json.dumps(files), json.dumps(sorted(folders)))
+                for path, mtime, files, folders in listings]
+        if not rows:
+            return
+        try:
+            connection = self._connect()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO listings (path, mtime, files, folders) "
+                    "VALUES (?, ?, ?, ?)", rows)
+        except (sqlite3.Error, OSError) as error:
+            self._fail(error)
+
+    def clear(self):
+        """Remove all stored listings."""
+        if self._disabled:
+            return
+        try:
+            connection = self._connect()
+            with connection:
+                connection.execute("DELETE FROM listings")
+        except (sqlite3.Error, OSError) as error:
+            self._fail(error)
+
+
+def get_store() -> Optional[ListingStore]:
+    """Get store at the default path, see get_default_path.
+
+    Args:
+
+    Returns:
+        ListingStore, None if it is disabled.
+    """
+    path = get_default_path()
+    return ListingStore(path) if path else None
@@ -0,0 +1,344 @@
+"""Quarantine of deleted files: they are moved to .trash of their volume and purged later.
+
+Rename on the same file system is instant regardless of size, so deletion of big caches
+does not wait for storage and can be undone until the grace period is over.
+Every deletion is a batch with a manifest of original paths.
+
+Usage from scripts/python for the farm or cron:
+    python -m files.trash list /mnt/projects
+    python -m files.trash restore /mnt/projects/.trash/20240702-120000-k3j5x9qa
+    python -m files.trash purge /mnt/projects --days 7
+"""
+
+import argparse
+import concurrent.futures
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Iterable, Optional
+
+from breakdown import profiling
+from files import disk
+
+TRASH_NAME = ".trash"
+MANIFEST_NAME = "manifest.json"
+# Days quarantined files are kept before purge.
+GRACE_DAYS = float(os.environ.get("BREAKDOWN_TRASH_DAYS") or 7)
+
+_PURGER = concurrent.futures.ThreadPoolExecutor(1)
+
+
+def get_trash(path: str) -> str:
+    """Get trash directory on the same volume as the path, rename to it never copies data.
+
+    Root of a network share is often not writable by artists, so trash goes to the highest
+    directory on the same volume which the artist can write to.
+
+    Args:
+        path (str): any existing path
+    Returns:
+        Path to .trash in the highest writable directory of the volume of the path,
+        at the mount point if no directory is writable.
+    """
+    directory = os.path.abspath(path)
+    if not os.path.isdir(directory):
+        directory = os.path.dirname(directory)
+    try:
+        device = os.stat(directory).st_dev
+    except OSError:
+        device = None
+    writable = None
+    while True:
+        if (os.access(os.path.join(directory, TRASH_NAME), os.W_OK)
+                or os.access(directory, os.W_OK)):
+            writable = directory
+        parent = os.path.dirname(directory)
+        if parent == directory or os.path.ismount(directory):
+            break
+        try:
+            if os.stat(parent).st_dev != device:
+                break
+        except OSError:
+            break
+        directory = parent
+    return os.path.join(writable or directory, TRASH_NAME)
+
+
+class Batch:
+    """Files moved to the trash of one volume by one deletion.
+
+    Manifest is written before anything is moved, so an interrupted quarantine
+    can still be restored.
+    """
+
+    def __init__(self, directory: str, created: Optional[float] = None,
+                 entries: Optional[list] = None):
+        self.directory = directory
+        self.created = time.time() if created is None else created
+        # Dicts of {"source": original path, "name": name in the batch, "size": bytes}.
+        self.entries = entries or []
+
+    @classmethod
+    def load(cls, directory: str) -> "Batch":
+        """Read batch from its manifest.
+
+        Args:
+            directory (str): directory of the batch in trash
+        Returns:
+            Batch with entries of the manifest.
+        """
+        with open(os.path.join(directory, MANIFEST_NAME), encoding="utf-8") as file:
+            data = json.load(file)
+        return cls(directory, data["created"], data["entries"])
+
+    def save(self):
+        """Write manifest of the batch, the old one is replaced atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump({"created": self.created, "entries": self.entries}, file, indent=1)
+        os.replace(path + ".tmp", path)
+
+    @property
+    def size(self) -> int:
+        """Bytes of all entries of the batch."""
+        return sum(entry["size"] for entry in self.entries)
+
+    def get_age(self, now: Optional[float] = None) -> float:
+        """Get days since the batch was created."""
+        return ((time.time() if now is None else now) - self.created) / 86400
+
+    def __str__(self) -> str:
+        return (f"{self.directory}: {len(self.entries)} entries "
+                f"({disk.format_size(self.size)}), {self.get_age():.1f} days old")
+
+
+def quarantine(
+        plan: disk.DeletionPlan,
+        progress: Optional[Callable[[int, int], bool]] = None) -> (disk.DeletionReport, list):
+    """Move files of the plan to trash of their volumes.
+
+    Version directories with no other files than planned ones are moved as a whole.
+
+    Args:
+        plan (disk.DeletionPlan): files to delete
+        progress (Optional[Callable[[int, int], bool]]): called with (done, total) after every
+            moved entry, returning False stops moving
+    Returns:
+        Tuple of (disk.DeletionReport, [Batch]), freed bytes are freed only after purge.
+    """
+    report = disk.DeletionReport(dry_run=False)
+    batches = {}
+    moves = _get_moves(plan)
+    files_by_source = dict(moves)
+    with profiling.PROFILER.phase("quarantine"):
+        entries = {}
+        for source, files in moves:
+            trash_entries = entries.setdefault(get_trash(source), [])
+            name = f"{len(trash_entries):06d}_{os.path.basename(source)}"
+            trash_entries.append({"source": source, "name": name,
+                                  "size": sum(plan.files[path] for path in files)})
+        try:
+            for trash, trash_entries in entries.items():
+                batches[trash] = Batch(_make_batch_directory(trash), entries=trash_entries)
+                batches[trash].save()
+        except OSError as error:
+            # Batches made in other trashes before the failure are not left behind empty.
+            for batch in batches.values():
+                shutil.rmtree(batch.directory, ignore_errors=True)
+            for path in plan.files:
+                report.failed[path] = f"Trash is not writable: {error.strerror or error}"
+            return report, []
+        done = 0
+        for batch in batches.values():
+            for entry in batch.entries:
+                source = entry["source"]
+                files = files_by_source[source]
+                target = os.path.join(batch.directory, entry["name"])
+                try:
+                    # Rename replaces existing files silently on POSIX.
+                    if os.path.lexists(target):
+                        raise FileExistsError(0, "Entry exists in trash")
+                    os.rename(source, target)
+                except OSError as error:
+                    for path in files:
+                        report.failed[path] = error.strerror or str(error)
+                else:
+                    report.deleted.extend(files)
+                    report.freed_bytes += entry["size"]
+                done += 1
+                if progress is not None and not progress(done, len(moves)):
+                    report.cancelled = True
+                    break
+            if report.cancelled:
+                break
+    return report, list(batches.values())
+
+
+def _make_batch_directory(trash: str) -> str:
+    # Name is unique even for quarantines of the same second, time keeps batches readable.
+    os.makedirs(trash, exist_ok=True)
+    return tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=trash)
+
+
+def _get_moves(plan: disk.DeletionPlan) -> list:
+    # Directory is moved as one entry if all entries in it are planned, files one by one otherwise.
+    by_directory = {}
+    for path in plan.files:
+        by_directory.setdefault(os.path.dirname(path), []).append(path)
+    moves = []
+    for directory, files in by_directory.items():
+        try:
+            names = set(os.listdir(directory))
+        except OSError:
+            names = None
+        if names == {os.path.basename(path) for path in files}:
+            moves.append((directory, files))
+        else:
+            moves.extend((path, [path]) for path in files)
+    return moves
+
+
+def restore(batch: Batch) -> (list, dict):
+    """Move entries of the batch back to their original paths, the batch is removed if empty.
+
+    Args:
+        batch (Batch): batch to restore
+    Returns:
+        Tuple of ([restored paths], {path: error}), existing original paths are not overwritten.
+    """
+    restored = []
+    failed = {}
+    remaining = []
+    for entry in batch.entries:
+        source = entry["source"]
+        quarantined = os.path.join(batch.directory, entry["name"])
+        if not os.path.lexists(quarantined):
+            continue
+        try:
+            if os.path.lexists(source):
+                raise FileExistsError(0, "Original path exists, it was written again")
+            os.makedirs(os.path.dirname(source), exist_ok=True)
+            os.rename(quarantined, source)
+        except OSError as error:
+            failed[source] = error.strerror or str(error)
+            remaining.append(entry)
+        else:
+            restored.append(source)
+    batch.entries = remaining
+    if remaining:
+        batch.save()
+    else:
+        shutil.rmtree(batch.directory, ignore_errors=True)
+    return restored, failed
+
+
+def get_batches(trashes: Iterable[str]) -> list[Batch]:
+    """Get batches of trash directories.
+
+    Args:
+        trashes (Iterable[str]): trash directories or any paths on their volumes
+    Returns:
+        Batches sorted from the oldest, directories without readable manifest are skipped.
+    """
+    batches = []
+    for trash in trashes:
+        if os.path.basename(os.path.normpath(trash)) != TRASH_NAME:
+            trash = get_trash(trash)
+        try:
+            names = os.listdir(trash)
+        except OSError:
+            continue
+        for name in names:
+            try:
+                batches.append(Batch.load(os.path.join(trash, name)))
+            except (OSError, KeyError, ValueError):
+                continue
+    return sorted(batches, key=lambda batch: batch.created)
+
+
+def purge(trashes: Iterable[str], grace_days: float = GRACE_DAYS,
+          now: Optional[float] = None) -> list[Batch]:
+    """Remove batches older than the grace period for good.
+
+    Args:
+        trashes (Iterable[str]): trash directories or any paths on their volumes
+        grace_days (float): days batches are kept
+        now (Optional[float]): time.time() to count days from, now if not set
+    Returns:
+        Purged batches.
+    """
+    purged = []
+    for batch in get_batches(trashes):
+        if batch.get_age(now) < grace_days:
+            continue
+        with profiling.PROFILER.phase("purge"):
+            # Manifest goes first, so a half removed batch is not offered for restore.
+            try:
+                os.remove(os.path.join(batch.directory, MANIFEST_NAME))
+            except OSError as error:
+                print(f"Cannot purge {batch.directory}: {error}")
+                continue
+            shutil.rmtree(batch.directory, ignore_errors=True)
+        purged.append(batch)
+    return purged
+
+
+def purge_async(trashes: Iterable[str], grace_days: float = GRACE_DAYS
+                ) -> concurrent.futures.Future:
+    """Purge in a background thread, see purge.
+
+    Args:
+        trashes (Iterable[str]): trash directories or any paths on their volumes
+        grace_days (float): days batches are kept
+    Returns:
+        Future of the purged batches, errors are printed when it is done.
+    """
+    future = _PURGER.submit(purge, list(trashes), grace_days)
+    future.add_done_callback(_report_purge)
+    return future
+
+
+def _report_purge(future: concurrent.futures.Future):
+    # Nobody waits for the purge, so its failure would be lost silently.
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Purge of trash failed: {future.exception()}")
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Starting point of the headless trash management."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="list batches")
+    list_parser.add_argument("trashes", nargs="+", help="trash directories or paths on volumes")
+    restore_parser = commands.add_parser("restore", help="restore batches")
+    restore_parser.add_argument("batches", nargs="+", help="directories of batches")
+    purge_parser = commands.add_parser("purge", help="remove batches older than grace period")
+    purge_parser.add_argument("trashes", nargs="+", help="trash directories or paths on volumes")
+    purge_parser.add_argument("--days", type=float, default=GRACE_DAYS)
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for batch in get_batches(args.trashes):
+            print(batch)
+        return 0
+    if args.command == "restore":
+        failed = {}
+        for directory in args.batches:
+            restored, errors = restore(Batch.load(directory))
+            failed.update(errors)
+            print(f"Restored {len(restored)} entries of {directory}.")
+        for path, error in failed.items():
+            print(f"{path}: {error}")
+        return 1 if failed else 0
+    purged = purge(args.trashes, args.days)
+    print(f"Purged {len(purged)} batches, "
+          f"freed {disk.format_size(sum(batch.size for batch in purged))}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,13 +7,12 @@ such as "Update to last version", "Delete Elder versions", "Delete Unused versio
 
 import sys
 import os
+import time
 
 # NB! This trick needed for 3d party libraries to work.
 path = os.path.join(os.path.dirname(__file__), "site-packages")
 sys.path.insert(0, path)
 
-from breakdown import logic
-
 
 # FIXME: known bug: sometimes item in table can dissapear when swapping one wrong version to another
 #        UPD: when /obj/testSphere/testSphere/file is version 5 and /obj/testBox/testBox/file too
@@ -38,6 +37,11 @@ from breakdown import logic
 #       With other variables, for example $F bug does not appear.
 
 def main():
-    """Starting point of the tool."""
-    dialog = logic.get_prepared_dialog()
-    dialog.show()
+    """Starting point of the tool.
+
+    Modules of the tool (with PySide2 and lucidity) are imported on the first click only,
+    the dialog stays resident for the rest of the session, see logic.show_dialog.
+    """
+    started = time.perf_counter()
+    from breakdown import logic  # pylint: disable=import-outside-toplevel
+    logic.show_dialog(started)
@@ -1,68 +1,365 @@
 """Main UI widget.
 """
-from PySide2 import QtWidgets
+import functools
+from typing import Optional
+
+from PySide2 import QtCore, QtGui, QtWidgets
 import hou  # pylint: disable=import-error
 
+from files import disk
+
+
+COLUMNS = [
+    "Asset",
+    "Node/Parm",
+    "Version",
+    "Versions Range",
+    "Size",
+    "Reclaimable",
+    "Update to last",
+    "Delete elder",
+    "Delete unused"
+]
+VERSION_COLUMN = 2
+SIZE_COLUMN = 4
+RECLAIMABLE_COLUMN = 5
+UPDATE_COLUMN = 6
+DELETE_ELDER_COLUMN = 7
+DELETE_UNUSED_COLUMN = 8
+# Status is the last of values of every row, it is not shown as a column.
+STATUS_VALUE = 6
+
+
+@functools.lru_cache(maxsize=None)
+def get_icon(name: str) -> QtGui.QIcon:
+    """Get standard icon of Houdini main window style, resolved only once per session.
+
+    Args:
+        name (str): name of QtWidgets.QStyle.StandardPixmap, for example "SP_ArrowUp"
+    Returns:
+        QIcon from the style of Houdini main window.
+    """
+    pixmapi = getattr(QtWidgets.QStyle, name)
+    return hou.qt.mainWindow().style().standardIcon(pixmapi)
+
+
+class BreakdownModel(QtCore.QAbstractTableModel):
+    """Table model over rows of the Breakdown.
 
-class BreakdownTable(QtWidgets.QTableWidget):
-    """Modified QTableWidget with respect to assignment spesifics."""
+    Rows are any objects with to_values() method returning
+    [name, parm path, version, versions range, size, reclaimable size, status]. Values are cached
+    and recomputed only when rows are updated, so painting never touches Houdini or file system.
+    Sizes are in bytes, they are rendered only for display so sorting compares numbers.
+    Status is a number, lower is worse: rows are filtered by it and sorted by it first
+    when sorted by name. Filtering and sorting use cached values only.
+    """
+
+    version_edited = QtCore.Signal(object, int)
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        # Shown rows and their values, all rows keep their order of the scene.
         self.rows = []
+        self._values = []
+        self._positions = {}
+        self._all = {}
+        self._statuses = None
+        self._sorting = None
+
+    def rowCount(self, parent=QtCore.QModelIndex()) -> int:  # pylint: disable=invalid-name
+        """Number of rows, see QAbstractTableModel."""
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()) -> int:  # pylint: disable=invalid-name
+        """Number of columns, see QAbstractTableModel."""
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    # pylint: disable-next=invalid-name
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        """Column titles, see QAbstractTableModel."""
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        """Cached values of rows, see QAbstractTableModel."""
+        column = index.column()
+        if not index.isValid() or column > RECLAIMABLE_COLUMN:
+            return None
+        if role == QtCore.Qt.DisplayRole and column in (SIZE_COLUMN, RECLAIMABLE_COLUMN):
+            return disk.format_size(self._values[index.row()][column])
+        if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+            return self._values[index.row()][column]
+        if role == QtCore.Qt.ToolTipRole and column == 1:
+            return self._values[index.row()][column]
+        return None
+
+    def flags(self, index):
+        """Only version column is editable, see QAbstractTableModel."""
+        flags = super().flags(index)
+        # Unmanaged rows have no version.
+        if index.column() == VERSION_COLUMN and self.data(index) is not None:
+            flags |= QtCore.Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):  # pylint: disable=invalid-name
+        """Emit version_edited instead of storing the value, see QAbstractTableModel."""
+        if role != QtCore.Qt.EditRole or index.column() != VERSION_COLUMN:
+            return False
+        if value != self._values[index.row()][VERSION_COLUMN]:
+            self.version_edited.emit(self.rows[index.row()], int(value))
+        return True
+
+    def update_items(self, rows: list):
+        """Replace all rows of the model."""
+        self.beginResetModel()
+        self._all = {item: item.to_values() for item in rows}
+        self._filter()
+        self.endResetModel()
+
+    def append_items(self, rows: list):
+        """Add rows to the end of the model, used while rows are streamed from a scan."""
+        shown = []
+        for item in rows:
+            values = self._all[item] = item.to_values()
+            if self._is_shown(values):
+                shown.append((item, values))
+        if not shown:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(shown) - 1)
+        for row, (item, values) in enumerate(shown, start):
+            self.rows.append(item)
+            self._values.append(values)
+            self._positions[item] = row
+        self.endInsertRows()
+
+    def update_rows(self, rows: list):
+        """Recompute cached values of given rows and notify views about them.
+
+        Rows whose status no longer passes the filter are hidden and the other way round.
+        """
+        refilter = False
+        for item in rows:
+            values = self._all[item] = item.to_values()
+            row = self._positions.get(item)
+            if (row is not None) != self._is_shown(values):
+                refilter = True
+            elif row is not None:
+                self._values[row] = values
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+        if refilter:
+            self.set_status_filter(self._statuses)
+
+    def set_status_filter(self, statuses: Optional[set] = None):
+        """Show only rows with given statuses, all rows if not set."""
+        self.beginResetModel()
+        self._statuses = statuses
+        self._filter()
+        self.endResetModel()
+
+    def _is_shown(self, values: list) -> bool:
+        return self._statuses is None or values[STATUS_VALUE] in self._statuses
+
+    def _filter(self):
+        # Called between begin and end of a model reset, sorting chosen by user is kept.
+        self.rows = [item for item, values in self._all.items() if self._is_shown(values)]
+        self._values = [self._all[item] for item in self.rows]
+        self._positions = {item: row for row, item in enumerate(self.rows)}
+        if self._sorting is not None:
+            self._sort(*self._sorting)
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Sort rows by cached values, button columns are not sortable, see QAbstractTableModel."""
+        if not 0 <= column < SIZE_COLUMN + 2:
+            return
+        self._sorting = (column, order)
+        if not self.rows:
+            return
+        self.layoutAboutToBeChanged.emit()
+        self._sort(column, order)
+        self.layoutChanged.emit()
+
+    def _sort(self, column: int, order: QtCore.Qt.SortOrder):
+        pairs = sorted(zip(self._values, self.rows), key=lambda pair: _get_key(pair[0], column),
+                       reverse=order == QtCore.Qt.DescendingOrder)
+        self._values = [values for values, _ in pairs]
+        self.rows = [item for _, item in pairs]
+        self._positions = {item: row for row, item in enumerate(self.rows)}
+
+
+def _get_key(values: list, column: int) -> tuple:
+    # Names are grouped by status, the worst first.
+    if column == 0:
+        return values[STATUS_VALUE], values[0]
+    # Empty values such as version of unmanaged rows go last.
+    return values[column] is None, values[column]
+
+
+class SpinBoxDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints version as a spinbox, real QSpinBox exists only while the cell is edited."""
+
+    def paint(self, painter, option, index):
+        """Draw spinbox frame and arrows with current style."""
+        if index.data() is None:
+            # Unmanaged rows have no version and nothing to edit, the cell stays empty.
+            super().paint(painter, option, index)
+            return
+        spin_option = QtWidgets.QStyleOptionSpinBox()
+        spin_option.rect = QtCore.QRect(QtCore.QPoint(0, 0), option.rect.size())
+        spin_option.state = option.state | QtWidgets.QStyle.State_Enabled
+        spin_option.frame = True
+        spin_option.stepEnabled = (QtWidgets.QAbstractSpinBox.StepUpEnabled
+                                   | QtWidgets.QAbstractSpinBox.StepDownEnabled)
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        # Styles differ in whether sub control rects are offset, so paint in cell coordinates.
+        painter.save()
+        painter.translate(option.rect.topLeft())
+        style.drawComplexControl(QtWidgets.QStyle.CC_SpinBox, spin_option, painter)
+        text_rect = style.subControlRect(QtWidgets.QStyle.CC_SpinBox, spin_option,
+                                         QtWidgets.QStyle.SC_SpinBoxEditField)
+        painter.setPen(option.palette.color(QtGui.QPalette.Text))
+        painter.drawText(text_rect, QtCore.Qt.AlignVCenter | QtCore.Qt.AlignLeft,
+                         str(index.data()))
+        painter.restore()
+
+    def createEditor(self, parent, option, index):  # pylint: disable=invalid-name
+        """Create QSpinBox which commits every change like the old cell widget did."""
+        editor = QtWidgets.QSpinBox(parent)
+        editor.setFrame(False)
+        editor.valueChanged.connect(lambda x: self.commitData.emit(editor))
+        return editor
+
+    def setEditorData(self, editor, index):  # pylint: disable=invalid-name
+        """Set model value to the editor without emitting changes back."""
+        editor.blockSignals(True)
+        editor.setValue(int(index.data(QtCore.Qt.EditRole)))
+        editor.blockSignals(False)
+
+    def setModelData(self, editor, model, index):  # pylint: disable=invalid-name
+        """Pass editor value to the model."""
+        model.setData(index, editor.value(), QtCore.Qt.EditRole)
+
+
+class ButtonDelegate(QtWidgets.QStyledItemDelegate):
+    """Paints a tool button with cached icon and emits clicked with the row index."""
+
+    clicked = QtCore.Signal(int)
+
+    def __init__(self, icon_name: str, parent=None):
+        super().__init__(parent)
+        self._icon_name = icon_name
+        self.enabled = True
+
+    def paint(self, painter, option, index):
+        """Draw the button with current style."""
+        button_option = QtWidgets.QStyleOptionButton()
+        button_option.rect = option.rect
+        button_option.state = QtWidgets.QStyle.State_Raised
+        if self.enabled:
+            button_option.state |= QtWidgets.QStyle.State_Enabled
+        button_option.icon = get_icon(self._icon_name)
+        button_option.iconSize = QtCore.QSize(16, 16)
+        style = option.widget.style() if option.widget else QtWidgets.QApplication.style()
+        style.drawControl(QtWidgets.QStyle.CE_PushButton, button_option, painter)
+
+    def editorEvent(self, event, model, option, index):  # pylint: disable=invalid-name
+        """Emit clicked when mouse is released over the button."""
+        if (self.enabled and event.type() == QtCore.QEvent.MouseButtonRelease
+                and event.button() == QtCore.Qt.LeftButton
+                and option.rect.contains(event.pos())):
+            self.clicked.emit(index.row())
+            return True
+        return False
+
+
+class BreakdownTable(QtWidgets.QTableView):
+    """QTableView with respect to assignment spesifics."""
+
+    version_changed = QtCore.Signal(object, int)
+    update_clicked = QtCore.Signal(object)
+    delete_elder_clicked = QtCore.Signal(object)
+    delete_unused_clicked = QtCore.Signal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.breakdown_model = BreakdownModel(self)
+        self.setModel(self.breakdown_model)
+        self.breakdown_model.version_edited.connect(self._version_edited)
+        self._buttons = []
+        self._actions_enabled = True
+        self.setItemDelegateForColumn(VERSION_COLUMN, SpinBoxDelegate(self))
+        self._connect_button(UPDATE_COLUMN, "SP_ArrowUp", self.update_clicked)
+        self._connect_button(DELETE_ELDER_COLUMN, "SP_MessageBoxCritical",
+                             self.delete_elder_clicked)
+        self._connect_button(DELETE_UNUSED_COLUMN, "SP_MessageBoxCritical",
+                             self.delete_unused_clicked)
+        self.setEditTriggers(QtWidgets.QAbstractItemView.AllEditTriggers)
         self.resize(1100, 500)
-        self.setColumnCount(7)
-        self.setHorizontalHeaderLabels(
-            [
-                "Asset",
-                "Node/Parm",
-                "Version",
-                "Versions Range",
-                "Update to last",
-                "Delete elder",
-                "Delete unused"
-            ]
-        )
         self.setColumnWidth(0, 250)
         self.setColumnWidth(1, 500)
         self.setColumnWidth(2, 50)
         self.setColumnWidth(3, 100)
-        self.setColumnWidth(4, 100)
-        self.setColumnWidth(5, 100)
+        self.setColumnWidth(4, 80)
+        self.setColumnWidth(5, 80)
         self.setColumnWidth(6, 100)
+        self.setColumnWidth(7, 100)
+        self.setColumnWidth(8, 100)
         self.verticalHeader().hide()
         self.horizontalHeader().setStretchLastSection(False)
         self.horizontalHeader().setSectionResizeMode(1, QtWidgets.QHeaderView.Stretch)
+        # Rows keep order of the scene until user clicks a header.
+        self.horizontalHeader().setSortIndicator(-1, QtCore.Qt.AscendingOrder)
+        self.setSortingEnabled(True)
 
-    def update_items(self, rows: list):
-        """Rerender items in table with new data."""
-        self.rows = rows
-        self.setRowCount(len(rows))
-        for row, item in enumerate(rows):
-            for column, value in enumerate(item.to_widgets()):
-                if isinstance(value, str):
-                    table_item = QtWidgets.QTableWidgetItem(value)
-                    self.setItem(row, column, table_item)
-                else:
-                    self.setCellWidget(row, column, value)
+    def _connect_button(self, column: int, icon_name: str, signal: QtCore.Signal):
+        delegate = ButtonDelegate(icon_name, self)
+        delegate.clicked.connect(lambda row: signal.emit(self.breakdown_model.rows[row]))
+        self.setItemDelegateForColumn(column, delegate)
+        self._buttons.append(delegate)
 
+    def _version_edited(self, row, version: int):
+        if self._actions_enabled:
+            self.version_changed.emit(row, version)
 
-class DeleteButton(QtWidgets.QToolButton):
-    """QToolButton with fancy delete icon."""
+    def set_actions_enabled(self, enabled: bool):
+        """Lock versions and buttons of rows, for example while rows are still scanned."""
+        self._actions_enabled = enabled
+        for delegate in self._buttons:
+            delegate.enabled = enabled
+        if enabled:
+            self.setEditTriggers(QtWidgets.QAbstractItemView.AllEditTriggers)
+        else:
+            self.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.viewport().update()
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        pixmapi = getattr(QtWidgets.QStyle, "SP_MessageBoxCritical")
-        self.setIcon(hou.qt.mainWindow().style().standardIcon(pixmapi))
+    @property
+    def rows(self) -> list:
+        """Rows currently shown in the table."""
+        return self.breakdown_model.rows
 
+    def update_items(self, rows: list):
+        """Rerender items in table with new data."""
+        self.breakdown_model.update_items(rows)
+        self._sort()
 
-class UpdateButton(QtWidgets.QToolButton):
-    """QToolButton with fancy update icon."""
+    def append_items(self, rows: list):
+        """Add items to the table keeping the sorting chosen by user."""
+        self.breakdown_model.append_items(rows)
+        self._sort()
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        pixmapi = getattr(QtWidgets.QStyle, "SP_ArrowUp")
-        self.setIcon(hou.qt.mainWindow().style().standardIcon(pixmapi))
+    def _sort(self):
+        header = self.horizontalHeader()
+        if header.sortIndicatorSection() >= 0:
+            self.breakdown_model.sort(header.sortIndicatorSection(), header.sortIndicatorOrder())
+
+    def update_rows(self, rows: list):
+        """Patch given items in place, other rows stay untouched."""
+        self.breakdown_model.update_rows(rows)
+
+    def set_status_filter(self, statuses: Optional[set] = None):
+        """Show only items with given statuses, all items if not set."""
+        self.breakdown_model.set_status_filter(statuses)
 
 
 class Dialog(QtWidgets.QDialog):
@@ -72,15 +369,86 @@ class Dialog(QtWidgets.QDialog):
         super().__init__(parent)
         self.setWindowTitle("Breakdown")
         self.table = BreakdownTable()
+        # Background scan currently filling the table, managed by breakdown.logic.
+        self.scan = None
+        # Watcher of asset directories, background refresh of the changed ones and directories
+        # changed while a scan or refresh was running, managed by breakdown.logic.
+        self.watcher = None
+        self.watched_refresh = None
+        self.changed_directories = set()
+        # All rows of the scene and their groups by asset, managed by breakdown.logic.
+        self.rows = []
+        self.groups = {}
         ver_layout = QtWidgets.QVBoxLayout()
+        scan_layout = QtWidgets.QHBoxLayout()
         hor_layout = QtWidgets.QHBoxLayout()
         ver_layout.addWidget(self.table)
+        ver_layout.addLayout(scan_layout)
         ver_layout.addLayout(hor_layout)
+        self.progress = QtWidgets.QProgressBar()
+        self.progress.setFormat("Scanning %v/%m")
+        self.cancel = QtWidgets.QPushButton("Cancel")
+        scan_layout.addWidget(self.progress)
+        scan_layout.addWidget(self.cancel)
         self.update_all = QtWidgets.QPushButton("Update All")
         self.delete_elder = QtWidgets.QPushButton("Delete elder")
         self.delete_unused = QtWidgets.QPushButton("Delete unused")
+        self.apply_retention = QtWidgets.QPushButton("Apply retention")
+        self.undo_delete = QtWidgets.QPushButton("Undo delete")
+        self.undo_delete.setToolTip("Restore files of the last deletion moved to trash")
+        self.rescan = QtWidgets.QPushButton("Rescan")
+        self.dry_run = QtWidgets.QCheckBox("Dry run")
+        self.dry_run.setToolTip("Only report files which would be deleted and their size")
+        self.quarantine = QtWidgets.QCheckBox("Quarantine")
+        self.quarantine.setToolTip("Move deleted files to .trash of their volume, "
+                                   "they can be restored until purged")
+        self.group_by_asset = QtWidgets.QCheckBox("Group by asset")
+        self.group_by_asset.setToolTip("Collapse parms using the same asset into one row")
+        self.status_filter = QtWidgets.QComboBox()
+        self.status_filter.setToolTip("Show only rows with the status")
+        self.watch = QtWidgets.QCheckBox("Watch")
+        self.watch.setToolTip("Refresh assets when new versions are written to disk")
+        self.stats_enabled = QtWidgets.QCheckBox("Stats")
+        self.stats_enabled.setToolTip("Measure time of every phase of the next runs")
+        self.stats = QtWidgets.QLabel()
+        self.stats.setWordWrap(True)
+        self.stats.setTextInteractionFlags(QtCore.Qt.TextSelectableByMouse)
         hor_layout.addWidget(self.update_all)
         hor_layout.addWidget(self.delete_elder)
         hor_layout.addWidget(self.delete_unused)
+        hor_layout.addWidget(self.apply_retention)
+        hor_layout.addWidget(self.undo_delete)
+        hor_layout.addWidget(self.rescan)
+        hor_layout.addWidget(self.dry_run)
+        hor_layout.addWidget(self.quarantine)
+        hor_layout.addWidget(self.group_by_asset)
+        hor_layout.addWidget(self.status_filter)
+        hor_layout.addWidget(self.watch)
+        hor_layout.addWidget(self.stats_enabled)
+        ver_layout.addWidget(self.stats)
         self.setLayout(ver_layout)
-        self.resize(1100, 500)
+        self.resize(1300, 500)
+        self.set_scanning(False)
+        self.set_stats("")
+
+    def set_scanning(self, scanning: bool):
+        """Show progress of the scan and lock all actions until it is finished."""
+        self.progress.setVisible(scanning)
+        self.cancel.setVisible(scanning)
+        self.update_all.setEnabled(not scanning)
+        self.delete_elder.setEnabled(not scanning)
+        self.delete_unused.setEnabled(not scanning)
+        self.apply_retention.setEnabled(not scanning)
+        self.undo_delete.setEnabled(not scanning)
+        # Versions used by rows not scanned yet are unknown, so no row may delete or update.
+        self.table.set_actions_enabled(not scanning)
+
+    def set_progress(self, done: int, total: int):
+        """Set progress of the scan."""
+        self.progress.setMaximum(total)
+        self.progress.setValue(done)
+
+    def set_stats(self, stats: str):
+        """Show stats of the last run in the footer, empty stats hide it."""
+        self.stats.setText(stats)
+        self.stats.setVisible(bool(stats))
@@ -0,0 +1,16 @@
+"""Make the modules of the tool importable, files.houdini is tested with benchmarks.fake_hou."""
+
+import os
+import sys
+
+import pytest
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                       "scripts", "python")
+sys.path[:0] = [SCRIPTS, os.path.join(SCRIPTS, "site-packages")]
+
+
+@pytest.fixture
+def job(tmp_path) -> str:
+    """$JOB directory of one test."""
+    return tmp_path.joinpath("job").as_posix()
@@ -0,0 +1,63 @@
+"""Planning and parallel deletion of files.disk."""
+
+import os
+import time
+
+from files import disk
+from tests import trees
+
+
+def test_plan_deletion_skips_missing_files_and_folders(job):
+    paths = trees.build_asset(job, "rock", [1, 2], size=5)
+    plan = disk.plan_deletion(paths + [f"{job}/fx/rock/v003/rock.bgeo.sc", f"{job}/fx/rock/v001"])
+    assert plan.files == {path: 5 for path in paths}
+    assert plan.total_bytes == 10
+    assert len(plan) == 2
+
+
+def test_dry_run_deletes_nothing(job):
+    paths = trees.build_asset(job, "rock", [1, 2], size=5)
+    progress = []
+    report = disk.delete_files(disk.plan_deletion(paths), dry_run=True,
+                               progress=lambda done, total: progress.append((done, total)))
+    assert report.dry_run
+    assert sorted(report.deleted) == paths
+    assert report.freed_bytes == 10
+    assert progress == [(2, 2)]
+    assert all(os.path.exists(path) for path in paths)
+
+
+def test_failures_are_collected(job):
+    paths = trees.build_asset(job, "rock", [1, 2, 3], size=5)
+    plan = disk.plan_deletion(paths)
+    # Both files change after planning: one is gone, the other became a directory.
+    os.remove(paths[0])
+    os.remove(paths[1])
+    os.makedirs(paths[1])
+    report = disk.delete_files(plan)
+    assert report.deleted == [paths[2]]
+    assert report.freed_bytes == 5
+    assert sorted(report.failed) == paths[:2]
+    assert not report.cancelled
+
+
+def test_cancelled_deletion_keeps_remaining_files(job, monkeypatch):
+    paths = trees.build_asset(job, "rock", [1], frames=range(1, 21))
+    plan = disk.plan_deletion(paths)
+    removed = []
+    remove = os.remove
+
+    def remove_slowly(path: str):
+        # Files after the first one are removed only after the cancel.
+        if removed:
+            time.sleep(0.1)
+        removed.append(path)
+        remove(path)
+
+    monkeypatch.setattr(disk, "_remove", remove_slowly)
+    report = disk.delete_files(plan, progress=lambda done, total: False, workers=1)
+    assert report.cancelled
+    assert 1 <= len(report.deleted) < len(paths)
+    assert sorted(report.deleted) == sorted(removed)
+    assert report.freed_bytes == 8 * len(report.deleted)
+    assert all(os.path.exists(path) for path in paths if path not in removed)
@@ -0,0 +1,109 @@
+"""Rows and deletion plans of breakdown.engine on real directories."""
+
+from breakdown import engine
+from breakdown import retention
+from tests import trees
+
+
+def build_rows(job: str, records: list) -> list:
+    return engine.Engine(trees.get_template(job)).build_rows(records)
+
+
+def test_versions_and_status(job):
+    trees.build_asset(job, "rock", [1, 2, 3])
+    rows = build_rows(job, [trees.get_record(job, "rock", 2, parm="/obj/a/file"),
+                            trees.get_record(job, "rock", 3, parm="/obj/b/file"),
+                            trees.get_record(job, "rock", 7, parm="/obj/c/file")])
+    assert [row.versions for row in rows] == [[1, 2, 3]] * 3
+    assert [row.status for row in rows] == [
+        engine.STATUS_OUTDATED, engine.STATUS_UP_TO_DATE, engine.STATUS_BROKEN]
+    assert rows[0].get_asset() == rows[1].get_asset() == f"{job}/fx/rock"
+    assert rows[0].get_version_range() == "1-3"
+
+
+def test_plan_update_all(job):
+    trees.build_asset(job, "rock", [1, 2, 3])
+    rows = build_rows(job, [trees.get_record(job, "rock", 1), trees.get_record(job, "rock", 3)])
+    assert engine.Engine.plan_update_all(rows) == [(rows[0], f"{job}/fx/rock/v003/rock.bgeo.sc")]
+
+
+def test_sequence_parms_at_different_frames_share_variant(job):
+    paths = trees.build_asset(job, "sim", [1, 3, 5], frames=[1, 2, 3])
+    rows = build_rows(job, [trees.get_record(job, "sim", 3, frame=1, parm="/obj/a/file"),
+                            trees.get_record(job, "sim", 5, frame=2, parm="/obj/b/file")])
+    assert rows[0].variant == rows[1].variant == f"{job}/fx/sim/v000/sim.$F4.bgeo.sc"
+    assert rows[0].get_reclaimable() == 3 * 8
+    assert engine.Engine.plan_unused(rows).paths == set(paths[:3])
+    assert engine.Engine.plan_elders(rows).paths == set(paths[:3])
+
+
+
+def test_plan_unused_keeps_versions_of_all_parms(job):
+    paths = trees.build_asset(job, "rock", range(1, 6))
+    rows = build_rows(job, [trees.get_record(job, "rock", 2, parm="/obj/a/file"),
+                            trees.get_record(job, "rock", 4, parm="/obj/b/file")])
+    plan = engine.Engine.plan_unused(rows)
+    assert plan.paths == {paths[0], paths[2], paths[4]}
+    assert plan.assets == {f"{job}/fx/rock"}
+    # Per row plans keep versions of the other parms of the asset too.
+    assert rows[0].get_unused()[1] == [paths[0], paths[2], paths[4]]
+
+
+def test_plan_elders_keeps_versions_of_all_parms(job):
+    paths = trees.build_asset(job, "rock", range(1, 6))
+    rows = build_rows(job, [trees.get_record(job, "rock", 2, parm="/obj/a/file"),
+                            trees.get_record(job, "rock", 4, parm="/obj/b/file")])
+    assert engine.Engine.plan_elders(rows).paths == {paths[0], paths[2]}
+
+
+def test_plans_are_separate_per_asset(job):
+    rocks = trees.build_asset(job, "rock", [1, 2])
+    trees.build_asset(job, "tree", [1, 2], step="env")
+    rows = build_rows(job, [trees.get_record(job, "rock", 2),
+                            trees.get_record(job, "tree", 1, step="env")])
+    assert len({row.get_asset() for row in rows}) == 2
+    plan = engine.Engine.plan_elders(rows)
+    assert plan.paths == {rocks[0]}
+    assert plan.assets == {f"{job}/fx/rock"}
+
+
+def test_plan_unused_sequence(job):
+    paths = trees.build_asset(job, "sim", [1, 2, 3], frames=[1, 2, 3])
+    rows = build_rows(job, [trees.get_record(job, "sim", 2, frame=1, parm="/obj/a/file"),
+                            trees.get_record(job, "sim", 2, frame=1, parm="/obj/b/file")])
+    assert rows[0].get_path(3) == f"{job}/fx/sim/v003/sim.$F4.bgeo.sc"
+    assert rows[0].status == engine.STATUS_OUTDATED
+    assert rows[0].get_size() == 9 * 8
+    plan = engine.Engine.plan_unused(rows)
+    assert plan.paths == set(paths[:3] + paths[6:])
+
+
+def test_unmanaged_rows_are_never_planned(job):
+    trees.build_asset(job, "rock", [1, 2])
+    rows = build_rows(job, [engine.Record("/obj/a/file", "$HIP/x.abc", f"{job}/x.abc")])
+    assert not rows[0].is_managed()
+    assert rows[0].status == engine.STATUS_BROKEN
+    assert engine.Engine.plan_unused(rows).paths == set()
+    assert engine.Engine.plan_update_all(rows) == []
+
+
+def test_plan_policy(job):
+    paths = trees.build_asset(job, "rock", range(1, 8))
+    open(f"{job}/fx/rock/v002/{retention.TAG_FILE}", "w", encoding="utf-8").close()
+    rows = build_rows(job, [trees.get_record(job, "rock", 4)])
+    policy = retention.Policy(keep_last=2, keep_previous=True, keep_tagged=True)
+    plan = engine.Engine.plan_policy(rows, policy)
+    # Kept: 4 used, 3 previous, 6 and 7 last, 2 tagged.
+    assert trees.get_versions(plan.paths) == [1, 5]
+    assert plan.paths == {paths[0], paths[4]}
+
+
+def test_policy_newer_than_days(job):
+    trees.build_asset(job, "rock", range(1, 4))
+    rows = build_rows(job, [trees.get_record(job, "rock", 1)])
+    assert rows[0].history.get_newer(0) == [1, 2, 3]
+    policy = retention.Policy(newer_than_days=1)
+    # Every version was written right now.
+    assert engine.Engine.plan_policy(rows, policy).paths == set()
+    later = engine.Engine.plan_policy(rows, policy, now=10 ** 10)
+    assert trees.get_versions(later.paths) == [2, 3]
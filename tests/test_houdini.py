@@ -0,0 +1,68 @@
+"""Transactional setting of parms by files.houdini on the fake hou of the benchmarks."""
+
+import importlib
+import sys
+
+import pytest
+
+from benchmarks import fake_hou
+
+NEW_PATH = "/tmp/job/fx/a{}/v002/a{}.bgeo.sc"
+
+
+@pytest.fixture
+def houdini(monkeypatch):
+    """files.houdini using the fake hou with an empty scene, update mode is restored after."""
+    fake_hou.clear()
+    monkeypatch.setattr(fake_hou, "_UPDATE_MODE", [fake_hou.updateMode.OnMouseUp])
+    monkeypatch.setitem(sys.modules, "hou", fake_hou)
+    module = importlib.import_module("files.houdini")
+    monkeypatch.setattr(module, "hou", fake_hou)
+    return module
+
+
+def add_parms(houdini, count: int) -> (list, list):
+    parms = [fake_hou.add_file_parm(f"/obj/n{i}/file", f"$JOB/fx/a{i}/v001/a{i}.bgeo.sc")
+             for i in range(count)]
+    return parms, [houdini.PathParm(parm) for parm in parms]
+
+
+def test_set_paths(houdini):
+    parms, path_parms = add_parms(houdini, 3)
+    houdini.set_paths([(parm, NEW_PATH.format(i, i)) for i, parm in enumerate(path_parms)])
+    assert [parm.unexpandedString() for parm in parms] == [
+        f"$JOB/fx/a{i}/v002/a{i}.bgeo.sc" for i in range(3)]
+    assert path_parms[0].get_expanded_path() == NEW_PATH.format(0, 0)
+    assert fake_hou.updateModeSetting() == fake_hou.updateMode.OnMouseUp
+
+
+def test_failed_set_paths_restores_current_values(houdini, monkeypatch):
+    parms, path_parms = add_parms(houdini, 4)
+    # Artist edits the parm after the harvest, the edit is what is restored.
+    parms[0].set("$JOB/fx/a0/v005/a0.bgeo.sc")
+    previous = [parm.read_raw_path() for parm in path_parms]
+    calls = []
+    set_value = fake_hou.Parm.set
+
+    def set_or_fail(parm, value: str):
+        calls.append(value)
+        if len(calls) == 3:
+            raise fake_hou.Error("Parm is locked.")
+        set_value(parm, value)
+
+    monkeypatch.setattr(fake_hou.Parm, "set", set_or_fail)
+    with pytest.raises(fake_hou.Error, match="locked"):
+        houdini.set_paths([(parm, NEW_PATH.format(i, i)) for i, parm in enumerate(path_parms)])
+    assert [parm.unexpandedString() for parm in parms] == previous
+    assert path_parms[0].get_raw_path() == "$JOB/fx/a0/v005/a0.bgeo.sc"
+    # Two parms were set and restored, the third failed and the last was never touched.
+    assert len(calls) == 5
+    assert fake_hou.updateModeSetting() == fake_hou.updateMode.OnMouseUp
+
+
+def test_get_parms_keeps_harvest_order(houdini):
+    parms = [fake_hou.add_file_parm(f"/obj/n{i}/file", f"$JOB/fx/a{i}/v001/a{i}.bgeo.sc")
+             for i in (3, 0, 2, 1)]
+    for mode in (houdini.HARVEST_REFERENCES, houdini.HARVEST_NODES):
+        assert [parm.get_full_parm_name() for parm in houdini.get_parms(mode)] == [
+            parm.path() for parm in parms]
@@ -0,0 +1,64 @@
+"""Project-wide deletion plans of breakdown.project across manifests of many scenes."""
+
+from breakdown import project
+from config import wrappers
+from tests import trees
+
+
+def write_manifest(job: str, tmp_path, scene: str, records: list) -> str:
+    path = tmp_path.joinpath(scene + project.MANIFEST_SUFFIX).as_posix()
+    project.write_manifest(path, f"{job}/{scene}.hip",
+                           wrappers.TemplateRegistry([trees.get_template(job)]), records)
+    return path
+
+
+def collect_usage(paths: list) -> project.Usage:
+    return project.collect_usage(paths, workers=1)
+
+
+def test_plan_keeps_versions_of_every_scene(job, tmp_path):
+    paths = trees.build_asset(job, "rock", range(1, 6))
+    manifests = [
+        write_manifest(job, tmp_path, "a", [trees.get_record(job, "rock", 2)]),
+        write_manifest(job, tmp_path, "b", [trees.get_record(job, "rock", 4)]),
+    ]
+    assert project.find_manifests([tmp_path.as_posix()]) == sorted(manifests)
+    usage = collect_usage(manifests)
+    assert usage.get_in_use(f"{job}/fx/rock") == {
+        (f"{job}/fx/rock/v000/rock.bgeo.sc", 2): 1, (f"{job}/fx/rock/v000/rock.bgeo.sc", 4): 1}
+    assert project.plan(usage, "unused", workers=1).paths == {paths[0], paths[2], paths[4]}
+    assert project.plan(usage, "elder", workers=1).paths == {paths[0], paths[2]}
+
+
+def test_scene_removed_from_usage(job, tmp_path):
+    paths = trees.build_asset(job, "rock", range(1, 4))
+    usage = collect_usage([
+        write_manifest(job, tmp_path, "a", [trees.get_record(job, "rock", 1)]),
+        write_manifest(job, tmp_path, "b", [trees.get_record(job, "rock", 1),
+                                            trees.get_record(job, "rock", 3, parm="/obj/x/f")]),
+    ])
+    usage.remove_scene(f"{job}/b.hip")
+    assert usage.scenes == [f"{job}/a.hip"]
+    assert project.plan(usage, "unused", workers=1).paths == set(paths[1:])
+
+
+def test_unreadable_manifest_is_an_error(tmp_path):
+    path = tmp_path.joinpath("broken" + project.MANIFEST_SUFFIX)
+    path.write_text("{", encoding="utf-8")
+    try:
+        collect_usage([path.as_posix()])
+    except ValueError as error:
+        assert "cannot be read" in str(error)
+    else:
+        raise AssertionError("ValueError is expected")
+
+
+def test_plan_keeps_sequences_of_scenes_saved_at_other_frames(job, tmp_path):
+    paths = trees.build_asset(job, "sim", [1, 3, 5], frames=[1, 2, 3])
+    usage = collect_usage([
+        write_manifest(job, tmp_path, "a", [trees.get_record(job, "sim", 3, frame=1)]),
+        write_manifest(job, tmp_path, "b", [trees.get_record(job, "sim", 5, frame=2)]),
+    ])
+    variant = f"{job}/fx/sim/v000/sim.$F4.bgeo.sc"
+    assert usage.get_in_use(f"{job}/fx/sim") == {(variant, 3): 1, (variant, 5): 1}
+    assert project.plan(usage, "unused", workers=1).paths == set(paths[:3])
@@ -0,0 +1,51 @@
+"""JSON Lines export and import of breakdown.results."""
+
+from breakdown import engine
+from breakdown import results
+from tests import trees
+
+
+def test_export_and_import(job, tmp_path):
+    trees.build_asset(job, "rock", [1, 2])
+    trees.build_asset(job, "sim", [1], frames=[1, 2])
+    records = [trees.get_record(job, "rock", 1), trees.get_record(job, "sim", 1, frame=2),
+               engine.Record("/obj/x/file", "$HIP/x.abc", f"{job}/x.abc")]
+    path = tmp_path.joinpath("scene" + results.RESULTS_SUFFIX).as_posix()
+    breakdown = engine.Engine(trees.get_template(job))
+    assert results.write_results(path, breakdown.iter_rows(records, keep=False)) == 3
+
+    rock, sim, unmanaged = results.read_results(path)
+    assert rock.record == records[0]
+    assert (rock.template, rock.version, rock.versions) == ("general", 1, [1, 2])
+    assert rock.fields["asset"] == "rock"
+    assert rock.status == engine.STATUS_OUTDATED
+    assert rock.sizes == {1: 8, 2: 8}
+    assert (sim.status, sim.sizes) == (engine.STATUS_UP_TO_DATE, {1: 16})
+    assert (unmanaged.template, unmanaged.version, unmanaged.status) == (
+        None, None, engine.STATUS_BROKEN)
+
+    rows = list(results.read_rows(path, engine.Engine(trees.get_template(job))))
+    assert [row.record for row in rows] == records
+    assert [row.status for row in rows] == [rock.status, sim.status, unmanaged.status]
+
+
+def test_exported_rows_are_released(job):
+    trees.build_asset(job, "rock", [1, 2])
+    breakdown = engine.Engine(trees.get_template(job))
+    records = [trees.get_record(job, "rock", version, parm=f"/obj/{version}/file")
+               for version in (1, 2)]
+    rows = list(breakdown.iter_rows(records, keep=False))
+    assert rows[0].asset.rows == []
+    kept = list(breakdown.iter_rows(records))
+    assert kept[0].asset.rows == kept
+
+
+def test_bad_line(tmp_path):
+    path = tmp_path.joinpath("bad.jsonl")
+    path.write_text('{"parm": "/obj/x/file"}\n', encoding="utf-8")
+    try:
+        list(results.read_results(path.as_posix()))
+    except ValueError as error:
+        assert str(error).startswith(f"{path.as_posix()}:1: ")
+    else:
+        raise AssertionError("ValueError is expected")
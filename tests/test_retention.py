@@ -0,0 +1,45 @@
+"""Versions kept by breakdown.retention and policies read from files."""
+
+import json
+
+import pytest
+
+from breakdown import retention
+
+
+@pytest.fixture
+def policy_path(tmp_path, monkeypatch) -> str:
+    """Path of the retention policy of the show, the file is not written yet."""
+    path = tmp_path.joinpath("retention.json").as_posix()
+    monkeypatch.setenv("BREAKDOWN_RETENTION", path)
+    return path
+
+
+def write(path: str, data):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+
+
+def test_version_ranges():
+    versions = retention.VersionSet([1, 2, 3, 5, 8, 9])
+    assert versions.get_ranges() == [(1, 3), (5, 5), (8, 9)]
+    assert str(versions) == "1-3, 5, 8-9"
+
+
+def test_get_policy(policy_path):
+    assert retention.get_policy() == retention.Policy()
+    write(policy_path, {"keep_last": 3, "keep_previous": True})
+    assert retention.get_policy() == retention.Policy(keep_last=3, keep_previous=True)
+
+
+@pytest.mark.parametrize("data", [{"keep_lats": 3}, [3], "keep_last"])
+def test_invalid_policy_falls_back_to_default(policy_path, data, capsys):
+    write(policy_path, data)
+    assert retention.get_policy() == retention.Policy()
+    assert f"Retention policy {policy_path} is not used" in capsys.readouterr().out
+
+
+def test_unreadable_policy_falls_back_to_default(policy_path):
+    with open(policy_path, "w", encoding="utf-8") as file:
+        file.write("{keep_last: 3")
+    assert retention.get_policy() == retention.Policy()
@@ -0,0 +1,62 @@
+"""Listings persisted by files.store and loaded back by files.disk.VersionIndex."""
+
+import os
+
+from breakdown import engine
+from files import disk
+from files import store
+from tests import trees
+
+
+def test_store_round_trip(tmp_path):
+    path = tmp_path.joinpath("index.sqlite").as_posix()
+    store.ListingStore(path).save([("/job/fx/rock", 1, {"a.bgeo": 8}, {"v001"}),
+                                   ("/job/fx/rock/v001", 2, {}, set()),
+                                   ("/job/fx/rockfall", 3, {}, set())])
+    reopened = store.ListingStore(path)
+    assert reopened.load("/job/fx/rock") == (1, {"a.bgeo": 8}, {"v001"})
+    assert reopened.load("/job/fx/sim") is None
+    assert sorted(path for path, *_ in reopened.load_tree("/job/fx/rock")) == [
+        "/job/fx/rock", "/job/fx/rock/v001"]
+
+
+def test_changed_directories_are_listed_again(job, tmp_path, monkeypatch):
+    database = tmp_path.joinpath("index.sqlite").as_posix()
+    old, new = [os.path.dirname(path) for path in trees.build_asset(job, "rock", [1, 2])]
+    first = disk.VersionIndex(store.ListingStore(database))
+    first.listdir(old)
+    first.listdir(new)
+    first.save()
+
+    with open(f"{new}/rock.1001.bgeo.sc", "wb"):
+        pass
+    # Timestamp granularity of the file system must not hide the change.
+    mtime = os.stat(new).st_mtime_ns + 10 ** 9
+    os.utime(new, ns=(mtime, mtime))
+    scanned = []
+    scan = disk.VersionIndex._scan  # pylint: disable=protected-access
+    monkeypatch.setattr(disk.VersionIndex, "_scan", staticmethod(
+        lambda directory, mtime: scanned.append(directory) or scan(directory, mtime)))
+    second = disk.VersionIndex(store.ListingStore(database))
+    assert second.listdir(old).files == {"rock.bgeo.sc": 8}
+    assert sorted(second.listdir(new).files) == ["rock.1001.bgeo.sc", "rock.bgeo.sc"]
+    assert scanned == [new]
+
+
+def test_listings_are_loaded_once_per_asset(job, tmp_path, monkeypatch):
+    database = tmp_path.joinpath("index.sqlite").as_posix()
+    records = [trees.get_record(job, "rock", 1), trees.get_record(job, "sim", 2)]
+    trees.build_asset(job, "rock", [1, 2])
+    trees.build_asset(job, "sim", [1, 2])
+    engine.Engine(trees.get_template(job), disk.VersionIndex(store.ListingStore(database))
+                  ).build_rows(records)
+
+    loaded = []
+    load_tree = store.ListingStore.load_tree
+    monkeypatch.setattr(store.ListingStore, "load", lambda self, path: loaded.append(path))
+    monkeypatch.setattr(store.ListingStore, "load_tree", lambda self, root: (
+        loaded.append(root + "/*") or load_tree(self, root)))
+    rows = engine.Engine(trees.get_template(job),
+                         disk.VersionIndex(store.ListingStore(database))).build_rows(records)
+    assert [row.versions for row in rows] == [[1, 2], [1, 2]]
+    assert loaded == [f"{job}/fx/rock/*", f"{job}/fx/sim/*"]
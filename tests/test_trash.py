@@ -0,0 +1,119 @@
+"""Quarantine, restore and purge of files.trash."""
+
+import os
+
+import pytest
+
+from files import disk
+from files import trash
+from tests import trees
+
+# Trash of the volume, tests use the temporary directory instead.
+GET_TRASH = trash.get_trash
+
+
+@pytest.fixture(autouse=True)
+def trash_directory(tmp_path, monkeypatch) -> str:
+    """Keep the trash of tests in the temporary directory instead of the mount point."""
+    directory = tmp_path.joinpath(trash.TRASH_NAME).as_posix()
+    monkeypatch.setattr(trash, "get_trash", lambda path: directory)
+    return directory
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_quarantine_and_restore(job, trash_directory):
+    paths = trees.build_asset(job, "sim", [1, 2], frames=[1, 2])
+    report, batches = trash.quarantine(disk.plan_deletion(paths[:2]))
+    assert sorted(report.deleted) == paths[:2]
+    assert report.freed_bytes == 16
+    assert not report.failed
+    assert not any(os.path.exists(path) for path in paths[:2])
+    assert all(os.path.exists(path) for path in paths[2:])
+    # Version directory holding only planned files is moved as one entry.
+    assert len(batches) == 1
+    assert [entry["source"] for entry in batches[0].entries] == [f"{job}/fx/sim/v001"]
+    assert trash.get_batches([trash_directory])[0].entries == batches[0].entries
+
+    restored, failed = trash.restore(batches[0])
+    assert restored == [f"{job}/fx/sim/v001"] and not failed
+    assert all(os.path.exists(path) for path in paths)
+    assert not os.path.exists(batches[0].directory)
+
+
+def test_quarantine_files_one_by_one(job):
+    paths = trees.build_asset(job, "sim", [1], frames=[1, 2, 3])
+    _, batches = trash.quarantine(disk.plan_deletion(paths[:2]))
+    assert sorted(entry["source"] for entry in batches[0].entries) == paths[:2]
+    assert os.path.exists(paths[2])
+
+
+def test_restore_does_not_overwrite(job):
+    path = trees.build_asset(job, "rock", [1])[0]
+    _, batches = trash.quarantine(disk.plan_deletion([path]))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as file:
+        file.write(b"new")
+    restored, failed = trash.restore(batches[0])
+    assert not restored and list(failed) == [os.path.dirname(path)]
+    assert read(path) == b"new"
+    # Entry stays in the batch to be restored later.
+    assert len(trash.Batch.load(batches[0].directory).entries) == 1
+
+
+def test_purge_after_grace_period(job, trash_directory):
+    path = trees.build_asset(job, "rock", [1])[0]
+    _, batches = trash.quarantine(disk.plan_deletion([path]))
+    created = batches[0].created
+    assert trash.purge([trash_directory], grace_days=7, now=created + 6 * 86400) == []
+    purged = trash.purge([trash_directory], grace_days=7, now=created + 8 * 86400)
+    assert [batch.directory for batch in purged] == [batches[0].directory]
+    assert not os.path.exists(batches[0].directory)
+    assert trash.get_batches([trash_directory]) == []
+
+
+def test_batches_of_the_same_second_do_not_share_directory(job, trash_directory):
+    first = f"{job}/a/f.bgeo"
+    second = f"{job}/b/f.bgeo"
+    for path, content in ((first, b"one"), (second, b"two")):
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as file:
+            file.write(content)
+        # Sibling file keeps the directory, so both batches hold an entry named 000000_f.bgeo.
+        open(path + ".keep", "wb").close()
+    _, first_batches = trash.quarantine(disk.plan_deletion([first]))
+    _, second_batches = trash.quarantine(disk.plan_deletion([second]))
+    assert first_batches[0].directory != second_batches[0].directory
+    assert len(trash.get_batches([trash_directory])) == 2
+    trash.restore(first_batches[0])
+    trash.restore(second_batches[0])
+    assert read(first) == b"one"
+    assert read(second) == b"two"
+
+
+def test_trash_falls_back_to_highest_writable_directory(job, monkeypatch):
+    path = trees.build_asset(job, "rock", [1])[0]
+    access = os.access
+    monkeypatch.setattr(os, "access", lambda directory, mode: (
+        (directory + "/").startswith(job + "/") and access(directory, mode)))
+    assert GET_TRASH(path) == f"{job}/{trash.TRASH_NAME}"
+    assert GET_TRASH(os.path.dirname(path)) == f"{job}/{trash.TRASH_NAME}"
+
+
+def test_failed_quarantine_removes_created_batches(job, tmp_path, monkeypatch):
+    paths = trees.build_asset(job, "rock", [1]) + trees.build_asset(job, "sim", [1])
+    rock_trash = tmp_path.joinpath("rock").as_posix()
+    sim_trash = tmp_path.joinpath("sim").as_posix()
+    monkeypatch.setattr(
+        trash, "get_trash", lambda source: rock_trash if "/rock/" in source + "/" else sim_trash)
+    # Trash of the second volume cannot be created, a file is in the way.
+    with open(sim_trash, "wb"):
+        pass
+    report, batches = trash.quarantine(disk.plan_deletion(paths))
+    assert not batches
+    assert sorted(report.failed) == sorted(paths)
+    assert os.listdir(rock_trash) == []
+    assert all(os.path.exists(path) for path in paths)
@@ -0,0 +1,115 @@
+"""Dispatching paths between templates of the show by config.wrappers."""
+
+import lucidity
+import pytest
+
+from config import wrappers
+
+ROOT = "/job"
+
+
+def get_registry(*names: str) -> wrappers.TemplateRegistry:
+    patterns = {
+        "shot_cache": ROOT + "/shots/{shot}/cache/{asset}/v{version}/{asset_basename}",
+        "fx": ROOT + "/fx/{asset}/v{version}/{asset_basename}",
+        "general": ROOT + "/{step}/{asset}/v{version}/{asset_basename}",
+    }
+    return wrappers.TemplateRegistry(wrappers.TemplateWrapper(name, patterns[name])
+                                     for name in names)
+
+
+def test_match_first_template_in_order():
+    registry = get_registry("fx", "general")
+    assert registry.match("/job/fx/sim/v001/sim.bgeo.sc").name == "fx"
+    assert registry.match("/job/anim/hero/v001/hero.abc").name == "general"
+    # Order of the registry decides when both templates match.
+    assert get_registry("general", "fx").match("/job/fx/sim/v001/sim.bgeo.sc").name == "general"
+
+
+def test_match_none():
+    registry = get_registry("shot_cache", "general")
+    assert registry.match("/job/shots/sh010/cache/sim/v001/sim.bgeo.sc").name == "shot_cache"
+    assert registry.match("/job/shots/sh010/cache/sim/sim.bgeo.sc") is None
+    assert registry.match("/other/fx/sim/v001/sim.bgeo.sc") is None
+
+
+def test_match_same_as_templates():
+    registry = get_registry("shot_cache", "fx", "general")
+    paths = ["/job/shots/sh010/cache/sim/v002/sim.bgeo.sc", "/job/fx/sim/v001/sim.bgeo.sc",
+             "/job/env/tree/v010/tree.usd", "/job/env/tree/tree.usd",
+             "/job/fx/v001/x.abc"]
+    for path in paths:
+        expected = next((template for template in registry.templates if template.match(path)),
+                        None)
+        assert registry.match(path) is expected, path
+
+
+PARITY_PATTERNS = [
+    ROOT + "/shots/{shot}/cache/{asset}/v{version}/{asset_basename}",
+    # Nested and duplicate placeholders.
+    ROOT + "/{asset.step}/{asset.name}/v{version}/{asset.name}_{frame}.bgeo.sc",
+    # Custom expressions.
+    ROOT + r"/{step}/{asset}/v{version:\d\d\d}/{asset}.{frame:-?\d+}.{ext:abc|bgeo\.sc}",
+]
+PARITY_PATHS = [
+    "/job/shots/sh010/cache/sim/v012/sim.bgeo.sc",
+    "/job/fx/sim/v001/sim_1001.bgeo.sc",
+    "/job/fx/sim/v001/other_1001.bgeo.sc",
+    "/job/fx/sim/v001/sim.1001.bgeo.sc",
+    "/job/fx/sim/v01/sim.1001.abc",
+    "/job/fx/sim/v001/sim.x.abc",
+    "/job/fx/sim/v001/sim.-5.abc",
+    "/other/fx/sim/v001/sim.1001.abc",
+    "",
+]
+
+
+def parse_or_error(template, path: str):
+    try:
+        return template.parse(path)
+    except lucidity.ParseError:
+        return lucidity.ParseError
+
+
+def format_or_error(template, data: dict):
+    try:
+        return template.format(data)
+    except lucidity.FormatError:
+        return lucidity.FormatError
+
+
+def test_compiled_template_same_as_lucidity():
+    for pattern in PARITY_PATTERNS:
+        template = lucidity.Template("parity", pattern)
+        compiled = wrappers.CompiledTemplate(template)
+        for path in PARITY_PATHS:
+            parsed = parse_or_error(template, path)
+            assert parse_or_error(compiled, path) == parsed, (pattern, path)
+            if isinstance(parsed, dict):
+                # Duplicates may differ in RELAXED mode, so the path is not always formatted back.
+                assert compiled.format(parsed) == template.format(parsed), (pattern, path)
+        assert format_or_error(compiled, {"shot": "sh010"}) is lucidity.FormatError
+        assert format_or_error(template, {"shot": "sh010"}) is lucidity.FormatError
+
+
+def test_parse_misses_are_cached():
+    template = get_registry("fx").templates[0]
+    path = "/job/env/tree/v001/tree.usd"
+    assert template.match(path) is None
+    assert template.match(path) is None
+    with pytest.raises(lucidity.ParseError):
+        template.parse(path)
+    cache = template._parse_cached.cache_info()  # pylint: disable=protected-access
+    assert (cache.misses, cache.hits) == (1, 2)
+
+
+def test_parse_and_format_round_trip():
+    template = get_registry("shot_cache").templates[0]
+    path = "/job/shots/sh010/cache/sim/v012/sim.bgeo.sc"
+    fields = template.parse(path)
+    assert fields["shot"] == "sh010"
+    assert int(fields["version"]) == 12
+    assert template.format(fields) == path
+    root, folder = template.get_version_folders(fields)
+    assert root == "/job/shots/sh010/cache/sim"
+    assert folder.fullmatch("v003").group(1) == "003"
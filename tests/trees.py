@@ -0,0 +1,68 @@
+"""Small $JOB trees on disk for tests."""
+
+import os
+from typing import Iterable, Optional
+
+from breakdown import engine
+from config import wrappers
+
+
+def get_template(job: str) -> wrappers.TemplateWrapper:
+    """Get the generic template of the job, see config.templates.get_generic_template."""
+    return wrappers.TemplateWrapper("general", job + "/{step}/{asset}/v{version}/{asset_basename}")
+
+
+def get_name(asset: str, frame: Optional[int] = None) -> str:
+    """Get file name of the asset, with frame number for sequences."""
+    return f"{asset}.bgeo.sc" if frame is None else f"{asset}.{frame:04d}.bgeo.sc"
+
+
+def build_asset(job: str, asset: str, versions: Iterable[int], frames: Iterable[int] = (),
+                step: str = "fx", size: int = 8) -> list[str]:
+    """Create files of every version of the asset.
+
+    Args:
+        job (str): $JOB directory
+        asset (str): name of the asset
+        versions (Iterable[int]): versions to create
+        frames (Iterable[int]): frames of a sequence, one file per version if empty
+        step (str): step of the asset
+        size (int): size of every file in bytes
+    Returns:
+        Paths of all created files.
+    """
+    paths = []
+    for version in versions:
+        directory = f"{job}/{step}/{asset}/v{version:03d}"
+        os.makedirs(directory, exist_ok=True)
+        for frame in list(frames) or [None]:
+            path = f"{directory}/{get_name(asset, frame)}"
+            with open(path, "wb") as file:
+                file.write(b"\0" * size)
+            paths.append(path)
+    return paths
+
+
+def get_record(job: str, asset: str, version: int, frame: Optional[int] = None,
+               parm: Optional[str] = None, step: str = "fx") -> engine.Record:
+    """Get record of a parm using the version, sequences are evaluated at the frame.
+
+    Args:
+        job (str): $JOB directory
+        asset (str): name of the asset
+        version (int): used version
+        frame (Optional[int]): current frame of a sequence parm, single file if not set
+        parm (Optional[str]): path of the parm, /obj/{asset}/file if not set
+        step (str): step of the asset
+    Returns:
+        engine.Record as read from the scene.
+    """
+    directory = f"{step}/{asset}/v{version:03d}"
+    raw_name = f"{asset}.bgeo.sc" if frame is None else f"{asset}.$F4.bgeo.sc"
+    return engine.Record(parm or f"/obj/{asset}/file", f"$JOB/{directory}/{raw_name}",
+                         f"{job}/{directory}/{get_name(asset, frame)}")
+
+
+def get_versions(paths: Iterable[str]) -> list[int]:
+    """Get sorted versions of the version directories of paths."""
+    return sorted({int(os.path.basename(os.path.dirname(path))[1:]) for path in paths})